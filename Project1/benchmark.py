@@ -0,0 +1,244 @@
+"""
+Benchmark Planner queries on synthetic timetables
+
+Reports queries/sec, the peak memory allocated while answering the queries,
+p50/p99 latency and the mean search work (SearchStats counters) for every
+engine and every query method. Timetables and queries are seeded, so runs
+are reproducible. Unless --latency-only is given, it then compares forward
+and bidirectional least_flights_earliest_route on a hub-and-spoke network,
+a uniform layover against a per-city connection-time table on a
+timetable ten times larger, k-best alternatives from one search against
+repeated cheapest_route calls with the flights already used removed, and
+one profile sweep against one route query per departure time.
+
+Usage: python benchmark.py [n_flights] [n_cities] [n_queries]
+                           [--network {random,hub}] [--timetable FILE.bin] [--seed N] [--latency-only]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from planner import Planner, ENGINES, _SEARCHES
+from search_stats import COUNTERS
+from timetable_gen import NETWORKS, random_table, hub_table
+from timetable_io import open_binary
+
+METHODS = ("least_flights_earliest_route", "cheapest_route", "least_flights_cheapest_route")
+
+
+def random_timetable(n_flights, n_cities, horizon=1440, seed=0):
+    """Random flights between uniformly chosen city pairs, as Flight objects"""
+    return list(random_table(n_flights, n_cities, horizon, seed))
+
+
+def hub_timetable(n_flights, n_cities, n_hubs=10, horizon=1440, seed=0):
+    """Hub-and-spoke flights, as Flight objects; see timetable_gen.hub_table"""
+    return list(hub_table(n_flights, n_cities, n_hubs, horizon, seed))
+
+
+def random_queries(n_queries, n_cities, horizon=1440, window=720, seed=1):
+    """Random (start_city, end_city, t1, t2) queries with a fixed window length"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n_queries):
+        start_city = rng.randrange(n_cities)
+        end_city = rng.randrange(n_cities - 1)
+        if end_city >= start_city:
+            end_city += 1
+        t1 = rng.randrange(horizon - window)
+        queries.append((start_city, end_city, t1, t1 + window))
+    return queries
+
+
+def measure(query, queries):
+    """Return (queries/sec, peak KiB allocated) for running query over queries"""
+    begin = time.perf_counter()
+    for q in queries:
+        query(*q)
+    elapsed = time.perf_counter() - begin
+
+    tracemalloc.start()
+    for q in queries:
+        query(*q)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return len(queries) / elapsed, peak / 1024
+
+
+def count_expansions(planner, query, queries):
+    """Return (results, average flights scanned per query) for query over queries"""
+    scanned = [0]
+
+    def counting(scan):
+        def wrapper(*args):
+            for i in scan(*args):
+                scanned[0] += 1
+                yield i
+        return wrapper
+
+    planner._feasible = counting(planner._feasible)
+    planner._feasible_in = counting(planner._feasible_in)
+    try:
+        results = [query(*q) for q in queries]
+    finally:
+        del planner._feasible, planner._feasible_in
+    return results, scanned[0] / len(queries)
+
+
+def compare_bidirectional(n_flights, n_cities, n_queries):
+    """Forward BFS against bidirectional search for least_flights_earliest_route on a hub network"""
+    flights = hub_timetable(n_flights, n_cities)
+    queries = random_queries(n_queries, n_cities)
+    planner = Planner(flights)
+    print(f"\nleast_flights_earliest_route on a hub-and-spoke timetable ({n_cities} cities)")
+    print(f"{'search':<14} {'queries/sec':>12} {'scanned/query':>14}")
+
+    results = []
+    for name, bidirectional in (("bfs", False), ("bidirectional", True)):
+        query = lambda *q: planner.least_flights_earliest_route(*q, bidirectional=bidirectional)
+        qps, _ = measure(query, queries)
+        routes, scanned = count_expansions(planner, query, queries)
+        results.append([(len(r), r[-1].arrival_time if r else None) for r in routes])
+        print(f"{name:<14} {qps:>12.1f} {scanned:>14.0f}")
+
+    agree = sum(a == b for a, b in zip(*results))
+    print(f"same (flights, arrival) on {agree}/{n_queries} queries")
+
+
+def compare_connection_times(n_flights, n_cities, n_queries):
+    """One default layover for every city against a per-city connection-time table"""
+    flights = random_timetable(n_flights, n_cities)
+    queries = random_queries(n_queries, n_cities)
+    rng = random.Random(2)
+    per_city = {city: rng.choice((10, 20, 30, 45, 60)) for city in range(n_cities)}
+    print(f"\nconnection times, {n_flights} flights")
+    print(f"{'table':<10} {'method':<30} {'queries/sec':>12}")
+
+    for name, min_connection_time in (("uniform", 20), ("per-city", per_city)):
+        planner = Planner(flights, min_connection_time=min_connection_time)
+        for method in METHODS:
+            qps, _ = measure(getattr(planner, method), queries)
+            print(f"{name:<10} {method:<30} {qps:>12.1f}")
+
+
+def naive_k_cheapest(planner, start_city, end_city, t1, t2, k):
+    """k alternatives by repeated cheapest_route calls, removing each found route's flights"""
+    routes, removed = [], []
+    for _ in range(k):
+        route = planner.cheapest_route(start_city, end_city, t1, t2)
+        if not route:
+            break
+        routes.append(route)
+        for flight in route:
+            planner.remove_flight(flight.flight_no)
+            removed.append(flight)
+    for flight in removed:
+        planner.add_flight(flight)
+    return routes
+
+
+def compare_k_best(n_flights, n_cities, n_queries, k=5):
+    """k_cheapest_routes against k repeated cheapest_route calls with flights removed"""
+    flights = random_timetable(n_flights, n_cities)
+    queries = random_queries(n_queries, n_cities)
+    print(f"\n{k} cheapest alternatives, {n_flights} flights")
+    print(f"{'approach':<20} {'queries/sec':>12}")
+
+    for name, query in (
+        ("repeated calls", lambda planner, *q: naive_k_cheapest(planner, *q, k)),
+        ("k_cheapest_routes", lambda planner, *q: planner.k_cheapest_routes(*q, k)),
+        ("k_earliest_routes", lambda planner, *q: planner.k_earliest_routes(*q, k)),
+    ):
+        planner = Planner(list(flights))
+        qps, _ = measure(lambda *q: query(planner, *q), queries)
+        print(f"{name:<20} {qps:>12.1f}")
+
+
+def compare_profile(n_flights, n_cities, n_origins, n_destinations=10):
+    """One profile sweep per origin against a least_flights_earliest_route call per departure"""
+    flights = random_timetable(n_flights, n_cities)
+    planner = Planner(flights)
+    rng = random.Random(3)
+    origins = rng.sample(range(n_cities), n_origins)
+    print(f"\nprofiles from {n_origins} origins, {n_flights} flights")
+    print(f"{'approach':<34} {'sec/origin':>12}")
+
+    begin = time.perf_counter()
+    for origin in origins:
+        planner.profile(origin)
+    print(f"{'profile (every city)':<34} {(time.perf_counter() - begin) / n_origins:>12.4f}")
+
+    begin = time.perf_counter()
+    for origin in origins:
+        destinations = rng.sample([city for city in range(n_cities) if city != origin], n_destinations)
+        for t in sorted(set(planner.departures.get(origin, ()))):
+            for destination in destinations:
+                planner.least_flights_earliest_route(origin, destination, t, float('inf'))
+    label = f"per-departure calls ({n_destinations} cities)"
+    print(f"{label:<34} {(time.perf_counter() - begin) / n_origins:>12.4f}")
+
+
+def latency(planner, queries):
+    """Run every method over queries with stats enabled and return SearchStats.summary() by method"""
+    stats = planner.enable_stats()
+    for method in METHODS:
+        query = getattr(planner, method)
+        for q in queries:
+            query(*q)
+    searches = stats.summary()
+    return {method: searches[_SEARCHES[method]] for method in METHODS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Planner queries on a synthetic or saved timetable")
+    parser.add_argument("n_flights", type=int, nargs="?", default=100_000)
+    parser.add_argument("n_cities", type=int, nargs="?", default=1000)
+    parser.add_argument("n_queries", type=int, nargs="?", default=20)
+    parser.add_argument("--network", choices=NETWORKS, default="random", help="synthetic timetable shape")
+    parser.add_argument("--timetable", help="binary timetable to load instead of generating one")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the timetable; queries use seed + 1")
+    parser.add_argument("--latency-only", action="store_true",
+                        help="skip the search comparisons after the latency table")
+    args = parser.parse_args()
+
+    if args.timetable:
+        table = open_binary(args.timetable)
+        n_cities = max(max(table.start_city, default=0), max(table.end_city, default=0)) + 1
+    elif args.network == "random":
+        table = random_table(args.n_flights, args.n_cities, seed=args.seed)
+        n_cities = args.n_cities
+    else:
+        table = hub_table(args.n_flights, args.n_cities, seed=args.seed)
+        n_cities = args.n_cities
+    n_flights, n_queries = len(table), args.n_queries
+    queries = random_queries(n_queries, n_cities, seed=args.seed + 1)
+
+    print(f"{n_flights} flights, {n_cities} cities, {n_queries} queries")
+    print(f"{'engine':<8} {'method':<30} {'queries/sec':>12} {'peak KiB':>12} {'p50 ms':>10} {'p99 ms':>10}")
+    counters = []
+    for engine in ENGINES:
+        planner = Planner(table, engine=engine)
+        rows = []
+        for method in METHODS:
+            rows.append(measure(getattr(planner, method), queries))
+        for method, (qps, peak), row in zip(METHODS, rows, latency(planner, queries).values()):
+            print(f"{engine:<8} {method:<30} {qps:>12.1f} {peak:>12.0f} "
+                  f"{1000 * row['p50']:>10.2f} {1000 * row['p99']:>10.2f}")
+            counters.append((engine, method, row))
+
+    print("\nwork per query")
+    print(f"{'engine':<8} {'method':<30}" + "".join(f" {name:>12}" for name in COUNTERS))
+    for engine, method, row in counters:
+        print(f"{engine:<8} {method:<30}" + "".join(f" {row[name]:>12.0f}" for name in COUNTERS))
+
+    if args.latency_only:
+        return
+    compare_bidirectional(n_flights, n_cities, n_queries)
+    compare_connection_times(10 * n_flights, n_cities, n_queries)
+    compare_k_best(n_flights, n_cities, n_queries)
+    compare_profile(n_flights, n_cities, min(n_queries, 5))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+
+
+class StepFunction:
+    def __init__(self, departures, arrivals):
+        """ Earliest arrival as a function of departure time from the origin
+
+        Args:
+            departures (array): Latest origin departure of each step, ascending
+            arrivals (array): Earliest arrival when leaving by the matching departure, ascending
+        """
+        self.departures = departures
+        self.arrivals = arrivals
+
+    def __call__(self, t):
+        """Earliest arrival when leaving the origin at or after t, or inf if there is none"""
+        k = bisect_left(self.departures, t)
+        return self.arrivals[k] if k < len(self.arrivals) else float('inf')
+
+    def __len__(self):
+        return len(self.departures)
+
+    def __iter__(self):
+        return zip(self.departures, self.arrivals)
+
+    def __repr__(self):
+        return f"StepFunction({list(self)})"
+
+
+class ConnectionScan:
+    def __init__(self, table, mct, rows=None):
+        """Connection-scan engine over a single departure-sorted flight array
+
+        Args:
+            table (FlightTable): Columnar timetable; routes are returned as indices into it
+            mct (array): Minimum connection time per city, shared with the planner
+            rows (iterable): Table rows to scan, or None for every row
+        """
+        self.mct = mct
+        self.counts = None  # Work counters of the last route scan
+        rows = range(len(table)) if rows is None else rows
+        order = sorted(rows, key=table.departure_time.__getitem__)
+
+        # Parallel typed arrays, one slot per connection in departure order
+        self.order = array('q', order)
+        self.departure = array('q', (table.departure_time[i] for i in order))
+        self.arrival = array('q', (table.arrival_time[i] for i in order))
+        self.start = array('q', (table.start_city[i] for i in order))
+        self.end = array('q', (table.end_city[i] for i in order))
+        self.fare = array('q', (table.fare[i] for i in order))
+
+    def insert(self, table, i):
+        """Add flight i of the table, keeping the arrays in departure order"""
+        c = bisect_right(self.departure, table.departure_time[i])
+        self.order.insert(c, i)
+        self.departure.insert(c, table.departure_time[i])
+        self.arrival.insert(c, table.arrival_time[i])
+        self.start.insert(c, table.start_city[i])
+        self.end.insert(c, table.end_city[i])
+        self.fare.insert(c, table.fare[i])
+
+    def remove(self, i, departure_time):
+        """Drop flight i, which departs at departure_time"""
+        c = self._position(i, departure_time)
+        for column in (self.order, self.departure, self.arrival, self.start, self.end, self.fare):
+            del column[c]
+
+    def update_fare(self, i, departure_time, fare):
+        """Change the fare of flight i, which departs at departure_time"""
+        self.fare[self._position(i, departure_time)] = fare
+
+    def _position(self, i, departure_time):
+        c = bisect_left(self.departure, departure_time)
+        while self.order[c] != i:
+            c += 1
+        return c
+
+    def route(self, start_city, end_city, t1, t2, objective):
+        """
+        Find the best route for the given objective in one pass over the connections
+        The route is returned as a list of flight indices into the table
+
+        objective is one of:
+            "hops"      - least flights, ties broken by earliest arrival
+            "fare"      - least total fare, ties broken by earliest arrival
+            "hops_fare" - least flights, then least fare, then earliest arrival
+        """
+        if start_city == end_city:
+            return []
+
+        if objective == "hops":
+            key = lambda hops, fare: hops
+        elif objective == "fare":
+            key = lambda hops, fare: fare
+        elif objective == "hops_fare":
+            key = lambda hops, fare: (hops, fare)
+        else:
+            raise ValueError(f"Unknown objective '{objective}'")
+
+        departure, arrival = self.departure, self.arrival
+        start, end, fare = self.start, self.end, self.fare
+        mct = self.mct
+
+        # Label arrays: flights taken, fare paid, connection, parent label
+        lab_hops, lab_fare, lab_conn, lab_parent = [], [], [], []
+
+        # Per city Pareto front of labels, sorted by arrival with strictly falling cost
+        fronts = {}
+
+        first = bisect_left(departure, t1)
+        last = bisect_right(departure, t2)
+        for c in range(first, last):
+            dep = departure[c]
+            arr = arrival[c]
+            if arr > t2:
+                continue
+
+            u = start[c]
+            if u == end_city:
+                continue
+            if u == start_city:
+                parent, hops, paid = -1, 1, fare[c]
+            else:
+                front = fronts.get(u)
+                if front is None:
+                    continue
+                # Latest label that still makes the connection carries the least cost
+                idx = bisect_right(front[0], dep - mct[u]) - 1
+                if idx < 0:
+                    continue
+                parent = front[2][idx]
+                hops = lab_hops[parent] + 1
+                paid = lab_fare[parent] + fare[c]
+
+            v = end[c]
+            if v == start_city:
+                continue  # The origin label (no flights, no fare) dominates everything here
+
+            label = len(lab_hops)
+            if self._insert(fronts, v, arr, key(hops, paid), label):
+                lab_hops.append(hops)
+                lab_fare.append(paid)
+                lab_conn.append(c)
+                lab_parent.append(parent)
+
+        # Work counters for SearchStats as (pushes, pops, pruned, peak_queue, relaxations):
+        # labels created, no queue, and every connection in the window scanned
+        labels = len(lab_hops)
+        self.counts = (labels, 0, last - first - labels, 0, last - first)
+
+        front = fronts.get(end_city)
+        if front is None:
+            return []
+
+        # The last label at the destination has the least cost
+        route = []
+        label = front[2][-1]
+        while label != -1:
+            route.append(self.order[lab_conn[label]])
+            label = lab_parent[label]
+        route.reverse()
+        return route
+
+    def profile(self, start_city, t1, t2):
+        """
+        Earliest-arrival profiles from start_city to every reachable city in one pass
+        Returns a dict city -> StepFunction over departures from start_city in [t1, t2]
+
+        Each connection is labelled with the latest departure from start_city that
+        can still catch it. The labels at each city form a front of (arrival, latest
+        departure) pairs, and the front at a destination is exactly its profile
+        """
+        departure, arrival = self.departure, self.arrival
+        start, end = self.start, self.end
+        mct = self.mct
+
+        # Per city front sorted by arrival; the cost is the negated latest departure
+        fronts = {}
+
+        first = bisect_left(departure, t1)
+        for c in range(first, len(departure)):
+            dep = departure[c]
+            if dep > t2:
+                break
+            arr = arrival[c]
+            if arr > t2:
+                continue
+
+            u = start[c]
+            if u == start_city:
+                latest = dep
+            else:
+                front = fronts.get(u)
+                if front is None:
+                    continue
+                idx = bisect_right(front[0], dep - mct[u]) - 1
+                if idx < 0:
+                    continue
+                latest = -front[1][idx]
+
+            v = end[c]
+            if v != start_city:
+                self._insert(fronts, v, arr, -latest, c)
+
+        return {
+            city: StepFunction(array('q', (-cost for cost in costs)), array('q', arrs))
+            for city, (arrs, costs, _) in fronts.items()
+        }
+
+    def pareto_profile(self, start_city):
+        """
+        Every journey from start_city that is Pareto-optimal in (departure from start_city,
+        arrival, total fare, flights), over all departure times, in one pass
+        Returns a dict city -> list of routes, each a list of flight indices into the table
+
+        Labels reaching a city wait in a heap by arrival. Before a connection out of the
+        city is scanned, the labels that make it join the city's bag of (departure, fare,
+        flights) labels unless one already there is no worse on all three, and the
+        connection extends every label in the bag
+        """
+        departure, arrival = self.departure, self.arrival
+        start, end, fare = self.start, self.end, self.fare
+        mct = self.mct
+
+        # Label arrays: connection taken, parent label
+        lab_conn, lab_parent = [], []
+
+        # Per city heap of (arrival, fare, flights, -departure, label) not yet in the bag
+        waiting = defaultdict(list)
+        # Per city bag of (departure, fare, flights, label), none dominating another
+        bags = defaultdict(list)
+        # Per city labels that entered its bag: the optimal journeys to it
+        journeys = defaultdict(list)
+
+        def settle(city, cutoff):
+            heap, bag = waiting[city], bags[city]
+            while heap and heap[0][0] <= cutoff:
+                _, paid, hops, dep, label = heapq.heappop(heap)
+                dep = -dep
+                if any(d >= dep and f <= paid and h <= hops for d, f, h, _ in bag):
+                    continue
+                bag[:] = [entry for entry in bag if entry[0] > dep or entry[1] < paid or entry[2] < hops]
+                bag.append((dep, paid, hops, label))
+                journeys[city].append(label)
+
+        for c in range(len(departure)):
+            u, v = start[c], end[c]
+            if v == start_city:
+                continue  # Leaving start_city again later is no worse on all four
+            if u == start_city:
+                extend = ((departure[c], 0, 0, -1),)
+            elif u in waiting:
+                settle(u, departure[c] - mct[u])
+                extend = bags[u]
+            else:
+                continue
+
+            # Labels already in v's bag arrived no later, so one no worse on the other
+            # three criteria dominates the extension outright
+            arr, cost = arrival[c], fare[c]
+            heap, bag = waiting[v], bags[v]
+            for dep, paid, hops, parent in extend:
+                paid += cost
+                hops += 1
+                if any(d >= dep and f <= paid and h <= hops for d, f, h, _ in bag):
+                    continue
+                heapq.heappush(heap, (arr, paid, hops, -dep, len(lab_conn)))
+                lab_conn.append(c)
+                lab_parent.append(parent)
+
+        for city in list(waiting):
+            settle(city, float('inf'))
+
+        routes = {}
+        for city, labels in journeys.items():
+            routes[city] = []
+            for label in labels:
+                route = []
+                while label != -1:
+                    route.append(self.order[lab_conn[label]])
+                    label = lab_parent[label]
+                route.reverse()
+                routes[city].append(route)
+        return routes
+
+    @staticmethod
+    def _insert(fronts, city, arr, cost, label):
+        """Insert (arr, cost) into the city's front unless an existing label dominates it"""
+        front = fronts.get(city)
+        if front is None:
+            fronts[city] = ([arr], [cost], [label])
+            return True
+
+        arrs, costs, ids = front
+        i = bisect_left(arrs, arr)
+        if i > 0 and costs[i - 1] <= cost:
+            return False
+        if i < len(arrs) and arrs[i] == arr and costs[i] <= cost:
+            return False
+
+        # Labels arriving no earlier with no lower cost are now dominated
+        j = i
+        while j < len(arrs) and costs[j] >= cost:
+            j += 1
+        arrs[i:j] = [arr]
+        costs[i:j] = [cost]
+        ids[i:j] = [label]
+        return True
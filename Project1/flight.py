@@ -1,4 +1,6 @@
 class Flight:
+    __slots__ = ("flight_no", "start_city", "departure_time", "end_city", "arrival_time", "fare")
+
     def __init__(self, flight_no, start_city, departure_time, end_city, arrival_time, fare):
         """ Class for the flights
 
@@ -23,4 +25,4 @@ If there are n flights, and m cities:
 1. Flight No. will be an integer in {0, 1, ... n-1}
 2. Cities will be denoted by an integer in {0, 1, .... m-1}
 3. Time is denoted by a non negative integer - we model time as going from t=0 to t=inf
-"""
\ No newline at end of file
+"""
@@ -0,0 +1,104 @@
+from array import array
+from flight import Flight
+
+COLUMNS = ("flight_no", "start_city", "departure_time", "end_city", "arrival_time", "fare")
+
+
+class FlightTable:
+    def __init__(self, flight_no=(), start_city=(), departure_time=(), end_city=(), arrival_time=(), fare=()):
+        """Columnar flight store: one typed array per Flight field, one slot per flight
+
+        Args:
+            flight_no (iterable of int): Unique ID of each flight
+            start_city (iterable of int): The city no. where each flight starts
+            departure_time (iterable of int): Time at which each flight starts
+            end_city (iterable of int): The city no. where each flight ends
+            arrival_time (iterable of int): Time at which each flight ends
+            fare (iterable of int): The cost of taking each flight
+        """
+        self.flight_no = array('q', flight_no)
+        self.start_city = array('q', start_city)
+        self.departure_time = array('q', departure_time)
+        self.end_city = array('q', end_city)
+        self.arrival_time = array('q', arrival_time)
+        self.fare = array('q', fare)
+
+        n = len(self.flight_no)
+        if any(len(getattr(self, column)) != n for column in COLUMNS):
+            raise ValueError("All flight columns must have the same length")
+
+        # city -> (lo, hi) when rows are grouped by start city and sorted by departure
+        self.city_ranges = None
+
+    @classmethod
+    def from_buffers(cls, columns, city_ranges=None):
+        """Wrap existing int64 buffers (e.g. memoryviews over an mmap) without copying them
+
+        Args:
+            columns (dict): One buffer per name in COLUMNS, all of the same length
+            city_ranges (dict): Optional city -> (lo, hi) row ranges covering every city, see grouped_by_city
+        """
+        table = cls.__new__(cls)
+        for column in COLUMNS:
+            setattr(table, column, columns[column])
+        table.city_ranges = city_ranges
+        return table
+
+    @classmethod
+    def from_flights(cls, flights):
+        """Build a table from Flight objects, in the same order"""
+        table = cls()
+        for flight in flights:
+            table.append(flight.flight_no, flight.start_city, flight.departure_time,
+                         flight.end_city, flight.arrival_time, flight.fare)
+        return table
+
+    def append(self, flight_no, start_city, departure_time, end_city, arrival_time, fare):
+        """Add one flight to the end of the table and return its index"""
+        self.city_ranges = None
+        self.flight_no.append(flight_no)
+        self.start_city.append(start_city)
+        self.departure_time.append(departure_time)
+        self.end_city.append(end_city)
+        self.arrival_time.append(arrival_time)
+        self.fare.append(fare)
+        return len(self.flight_no) - 1
+
+    def copy(self):
+        """Return an independent, writable copy; buffer columns (e.g. from a mapped file) become arrays"""
+        table = FlightTable(*(getattr(self, column) for column in COLUMNS))
+        if self.city_ranges is not None:
+            table.city_ranges = dict(self.city_ranges)
+        return table
+
+    def grouped_by_city(self):
+        """Return a copy with rows ordered by (start_city, departure_time) and city_ranges set"""
+        # Two stable sorts instead of one on (start, departure) tuples, and columns
+        # filled from generators, so large tables need no per-row tuples or lists
+        order = sorted(range(len(self)), key=self.departure_time.__getitem__)
+        order.sort(key=self.start_city.__getitem__)
+        table = FlightTable(*(map(getattr(self, column).__getitem__, order) for column in COLUMNS))
+
+        table.city_ranges = {}
+        lo = 0
+        start = table.start_city
+        for hi in range(1, len(table) + 1):
+            if hi == len(table) or start[hi] != start[lo]:
+                table.city_ranges[start[lo]] = (lo, hi)
+                lo = hi
+        # Cities with arrivals only get an empty range, so city_ranges names every city
+        for city in set(table.end_city):
+            table.city_ranges.setdefault(city, (0, 0))
+        return table
+
+    def __len__(self):
+        return len(self.flight_no)
+
+    def __getitem__(self, i):
+        """Materialize flight i as a Flight object; nothing is cached"""
+        return Flight(self.flight_no[i], self.start_city[i], self.departure_time[i],
+                      self.end_city[i], self.arrival_time[i], self.fare[i])
+
+    def __iter__(self):
+        for i in range(len(self.flight_no)):
+            yield self[i]
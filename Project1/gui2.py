@@ -1,7 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
+import queue
+import threading
 from flight import Flight
-from planner import Planner
+from planner import Planner, SearchCancelled
+
+# Route searches run in this order on the worker thread: (planner method, heading, description)
+SEARCHES = (
+    ("least_flights_earliest_route", "LEAST FLIGHTS, EARLIEST ARRIVAL",
+     "Minimizes flights, breaks ties by earliest arrival"),
+    ("cheapest_route", "CHEAPEST ROUTE", "Minimizes total fare cost"),
+    ("least_flights_cheapest_route", "LEAST FLIGHTS, CHEAPEST",
+     "Minimizes flights, breaks ties by lowest cost"),
+)
+POLL_MS = 50  # How often the Tk loop checks for worker messages
+RENDER_CHUNK = 200  # Result lines inserted per Tk loop tick
 
 class FlightPlannerGUI:
     def __init__(self, root):
@@ -19,6 +32,22 @@ class FlightPlannerGUI:
             Flight(5, 3, 100, 4, 150, 500),
             Flight(6, 3, 100, 4, 250, 300)
         ]
+        self.next_flight_no = len(self.flights)
+        
+        # One live planner, updated in place as flights are added or deleted
+        self.planner = Planner(self.flights)
+        
+        # Background search state: every search gets a new id, and messages from
+        # the worker carrying an older id are stale and dropped
+        self.search_id = 0
+        self.cancel_event = None
+        # Only one thread uses the planner at a time: searches started and schedule
+        # changes made while a cancelled worker is still unwinding wait in deferred
+        self.worker = None
+        self.deferred = []
+        self.messages = queue.Queue()
+        self.searching = False
+        self.searched_text = None
         
         self.setup_ui()
         self.refresh_flight_list()
@@ -115,8 +144,19 @@ class FlightPlannerGUI:
         self.search_entries["t1"].insert(0, "0")
         self.search_entries["t2"].insert(0, "300")
         
-        # Search button
-        ttk.Button(search_frame, text="Find Routes", command=self.find_routes).grid(row=2, column=0, columnspan=4, pady=20)
+        # Editing the query makes any running search stale
+        for entry in self.search_entries.values():
+            entry.bind("<KeyRelease>", self.query_edited)
+        
+        # Search and cancel buttons
+        ttk.Button(search_frame, text="Find Routes", command=self.find_routes).grid(row=2, column=0, columnspan=2, pady=20)
+        ttk.Button(search_frame, text="Cancel", command=self.cancel_search).grid(row=2, column=2, columnspan=2, pady=20)
+        
+        # Search progress
+        self.progress = ttk.Progressbar(search_frame, maximum=len(SEARCHES), length=300)
+        self.progress.grid(row=3, column=0, columnspan=4, pady=5)
+        self.status = ttk.Label(search_frame, text="")
+        self.status.grid(row=4, column=0, columnspan=4)
         
         # Instructions
         info_frame = ttk.LabelFrame(self.search_frame, text="Route Types", padding=10)
@@ -160,9 +200,12 @@ Route Types Explained:
                 return
             
             # Create new flight
-            flight_no = len(self.flights)
+            flight_no = self.next_flight_no
+            self.next_flight_no += 1
             new_flight = Flight(flight_no, start_city, departure_time, end_city, arrival_time, fare)
+            self.cancel_search()
             self.flights.append(new_flight)
+            self.when_idle(lambda: self.planner.add_flight(new_flight))
             
             # Clear entries
             for entry in self.flight_entries.values():
@@ -185,10 +228,10 @@ Route Types Explained:
         item = self.flight_tree.item(selected[0])
         flight_no = int(item['values'][0])
         
-        # Remove flight and reassign flight numbers
+        # Remove flight; numbers are not reassigned so the planner can track flights by number
+        self.cancel_search()
         self.flights = [f for f in self.flights if f.flight_no != flight_no]
-        for i, flight in enumerate(self.flights):
-            flight.flight_no = i
+        self.when_idle(lambda: self.planner.remove_flight(flight_no))
         
         self.refresh_flight_list()
         messagebox.showinfo("Success", "Flight deleted successfully!")
@@ -216,76 +259,154 @@ Route Types Explained:
             end_city = int(self.search_entries["end_city"].get())
             t1 = int(self.search_entries["t1"].get())
             t2 = int(self.search_entries["t2"].get())
-            
-            # Create planner and find routes
-            planner = Planner(self.flights)
-            
-            route1 = planner.least_flights_earliest_route(start_city, end_city, t1, t2)
-            route2 = planner.cheapest_route(start_city, end_city, t1, t2)
-            route3 = planner.least_flights_cheapest_route(start_city, end_city, t1, t2)
-            
-            # Display results
-            self.display_results(route1, route2, route3, start_city, end_city, t1, t2)
-            
         except ValueError:
             messagebox.showerror("Error", "Please enter valid numbers for all search parameters")
+            return
+        
+        # Run the searches on a worker thread so the window stays responsive
+        self.cancel_search()
+        self.cancel_event = threading.Event()
+        self.searching = True
+        self.searched_text = self.query_text()
+        self.progress['value'] = 0
+        self.status.config(text="Searching...")
+        search_id, cancel_event = self.search_id, self.cancel_event
+        self.when_idle(lambda: self.start_worker(search_id, cancel_event, (start_city, end_city, t1, t2)))
+        self.root.after(POLL_MS, self.poll_search)
+    
+    def start_worker(self, search_id, cancel_event, query):
+        if search_id != self.search_id:
+            return  # Cancelled before the planner was free
+        self.planner.cancel_event = cancel_event
+        self.worker = threading.Thread(target=self.run_searches, args=(search_id, cancel_event, query), daemon=True)
+        self.worker.start()
+    
+    def when_idle(self, action):
+        """Run action on the Tk thread now, or after the actions already waiting once the search worker has exited"""
+        if not self.deferred and (self.worker is None or not self.worker.is_alive()):
+            action()
+            return
+        self.deferred.append(action)
+        if len(self.deferred) == 1:
+            self.root.after(POLL_MS, self.run_deferred)
+    
+    def run_deferred(self):
+        # Actions run in order; one that starts a new worker makes the rest wait for it
+        while self.deferred and not self.worker.is_alive():
+            self.deferred.pop(0)()
+        if self.deferred:
+            self.root.after(POLL_MS, self.run_deferred)
+    
+    def run_searches(self, search_id, cancel_event, query):
+        """Worker thread: run every search in SEARCHES, reporting progress through the message queue"""
+        routes = []
+        try:
+            for method, heading, _ in SEARCHES:
+                routes.append(getattr(self.planner, method)(*query))
+                self.messages.put((search_id, "progress", (len(routes), heading)))
+        except SearchCancelled:
+            return  # The planner checks cancel_event at every city it expands
+        except Exception as e:
+            self.messages.put((search_id, "error", e))
+            return
+        self.messages.put((search_id, "done", (routes, query)))
+    
+    def poll_search(self):
+        """Handle the worker's messages on the Tk thread, dropping stale ones"""
+        while True:
+            try:
+                search_id, kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if search_id != self.search_id:
+                continue
+            
+            if kind == "progress":
+                done, heading = payload
+                self.progress['value'] = done
+                self.status.config(text=f"Searching... {done}/{len(SEARCHES)} ({heading.lower()} done)")
+            elif kind == "done":
+                self.searching = False
+                self.status.config(text="Search complete")
+                routes, query = payload
+                self.display_results(*routes, *query)
+            else:
+                self.searching = False
+                self.status.config(text="Search failed")
+                messagebox.showerror("Error", f"Route search failed: {payload}")
+        
+        if self.searching:
+            self.root.after(POLL_MS, self.poll_search)
+    
+    def cancel_search(self, reason="Search cancelled"):
+        """Make any running search and pending rendering stale; the worker stops at its next expansion"""
+        self.search_id += 1
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        if self.searching:
+            self.searching = False
+            self.progress['value'] = 0
+            self.status.config(text=reason)
+    
+    def query_edited(self, event):
+        # Key presses that leave the text alone (e.g. Tab) keep the search going
+        if self.query_text() != self.searched_text:
+            self.cancel_search("Query changed, search cancelled")
+    
+    def query_text(self):
+        return tuple(entry.get() for entry in self.search_entries.values())
     
     def display_results(self, route1, route2, route3, start_city, end_city, t1, t2):
         # Clear previous results
         self.results_text.delete(1.0, tk.END)
         
         # Header
-        header = f"ROUTE SEARCH RESULTS\n"
-        header += f"From City {start_city} to City {end_city}\n"
-        header += f"Time window: {t1} to {t2}\n"
-        header += "="*60 + "\n\n"
-        
-        self.results_text.insert(tk.END, header)
-        
-        # Route 1: Least Flights, Earliest Arrival
-        self.results_text.insert(tk.END, "1. LEAST FLIGHTS, EARLIEST ARRIVAL\n")
-        self.results_text.insert(tk.END, "-" * 40 + "\n")
-        if route1:
-            self.display_route(route1, "Minimizes flights, breaks ties by earliest arrival")
-        else:
-            self.results_text.insert(tk.END, "No valid route found\n")
-        self.results_text.insert(tk.END, "\n")
-        
-        # Route 2: Cheapest Route
-        self.results_text.insert(tk.END, "2. CHEAPEST ROUTE\n")
-        self.results_text.insert(tk.END, "-" * 40 + "\n")
-        if route2:
-            self.display_route(route2, "Minimizes total fare cost")
-        else:
-            self.results_text.insert(tk.END, "No valid route found\n")
-        self.results_text.insert(tk.END, "\n")
-        
-        # Route 3: Least Flights, Cheapest
-        self.results_text.insert(tk.END, "3. LEAST FLIGHTS, CHEAPEST\n")
-        self.results_text.insert(tk.END, "-" * 40 + "\n")
-        if route3:
-            self.display_route(route3, "Minimizes flights, breaks ties by lowest cost")
-        else:
-            self.results_text.insert(tk.END, "No valid route found\n")
-        self.results_text.insert(tk.END, "\n")
+        lines = [
+            "ROUTE SEARCH RESULTS\n",
+            f"From City {start_city} to City {end_city}\n",
+            f"Time window: {t1} to {t2}\n",
+            "=" * 60 + "\n\n",
+        ]
+        
+        for k, (route, (_, heading, description)) in enumerate(zip((route1, route2, route3), SEARCHES), 1):
+            lines.append(f"{k}. {heading}\n")
+            lines.append("-" * 40 + "\n")
+            if route:
+                lines.extend(self.display_route(route, description))
+            else:
+                lines.append("No valid route found\n")
+            lines.append("\n")
+        
+        # Long result lists are inserted a chunk per Tk tick so the window stays responsive
+        self.render_lines(lines, 0, self.search_id)
     
     def display_route(self, route, description):
+        """Return the text lines describing route"""
         total_cost = sum(flight.fare for flight in route)
         total_time = route[-1].arrival_time - route[0].departure_time if route else 0
         
-        self.results_text.insert(tk.END, f"Description: {description}\n")
-        self.results_text.insert(tk.END, f"Number of flights: {len(route)}\n")
-        self.results_text.insert(tk.END, f"Total cost: ${total_cost}\n")
-        self.results_text.insert(tk.END, f"Total travel time: {total_time} units\n")
-        self.results_text.insert(tk.END, f"Departure: {route[0].departure_time}, Arrival: {route[-1].arrival_time}\n\n")
-        
-        self.results_text.insert(tk.END, "Flight Details:\n")
+        lines = [
+            f"Description: {description}\n",
+            f"Number of flights: {len(route)}\n",
+            f"Total cost: ${total_cost}\n",
+            f"Total travel time: {total_time} units\n",
+            f"Departure: {route[0].departure_time}, Arrival: {route[-1].arrival_time}\n\n",
+            "Flight Details:\n",
+        ]
         for i, flight in enumerate(route, 1):
             flight_info = f"  {i}. Flight {flight.flight_no}: "
             flight_info += f"City {flight.start_city} -> City {flight.end_city} "
             flight_info += f"({flight.departure_time}-{flight.arrival_time}) ${flight.fare}\n"
-            self.results_text.insert(tk.END, flight_info)
-
+            lines.append(flight_info)
+        return lines
+    
+    def render_lines(self, lines, start, search_id):
+        if search_id != self.search_id:
+            return  # A newer search owns the results tab
+        end = start + RENDER_CHUNK
+        self.results_text.insert(tk.END, "".join(lines[start:end]))
+        if end < len(lines):
+            self.root.after(1, self.render_lines, lines, end, search_id)
 
 def main():
     root = tk.Tk()
@@ -1,5 +1,163 @@
+import random
 from flight import Flight
-from planner import Planner
+from planner import Planner, QUERY_METHODS
+from timetable_gen import random_table
+from transfer_patterns import TransferPatterns
+
+def objective(method, route):
+    """What a query method optimizes, so routes that tie on it compare equal"""
+    hops = len(route)
+    arrival = route[-1].arrival_time if route else None
+    fare = sum(flight.fare for flight in route)
+    if method == "least_flights_earliest_route":
+        return hops, arrival
+    if method == "cheapest_route":
+        return fare
+    return hops, fare
+
+def random_queries(rng, n_cities, n_queries, horizon):
+    for _ in range(n_queries):
+        start_city, end_city = rng.sample(range(n_cities), 2)
+        t1 = rng.randrange(horizon // 2)
+        yield start_city, end_city, t1, rng.randrange(t1, 2 * horizon)
+
+def check_bidirectional(n_timetables=200, horizon=300):
+    """Bidirectional search and connection scan must give the same (flights, arrival) as forward BFS"""
+    rng = random.Random(10)
+    for seed in range(n_timetables):
+        n_cities = rng.randint(2, 8)
+        table = random_table(rng.randint(1, 40), n_cities, horizon, seed)
+        planner, scan = Planner(table), Planner(table, engine="csa")
+        for query in random_queries(rng, n_cities, 20, horizon):
+            forward = objective("least_flights_earliest_route", planner.least_flights_earliest_route(*query))
+            both = planner.least_flights_earliest_route(*query, bidirectional=True)
+            if (objective("least_flights_earliest_route", both) != forward or
+                    objective("least_flights_earliest_route", scan.least_flights_earliest_route(*query)) != forward):
+                return False
+    return True
+
+def check_live_updates(n_timetables=100, horizon=300):
+    """After add_flight / remove_flight / update_fare a live planner must answer like a fresh one"""
+    rng = random.Random(11)
+    for seed in range(n_timetables):
+        n_cities = rng.randint(2, 6)
+        table = random_table(rng.randint(1, 20), n_cities, horizon, seed)
+        current = {flight.flight_no: flight for flight in table}
+        live = [Planner(table), Planner(table, engine="csa"), Planner(list(table))]
+        next_no = len(table)
+        for step in range(10):
+            change = rng.random()
+            if change < 0.4 or not current:
+                flight = random_table(1, n_cities, horizon, rng.randrange(10**9))[0]
+                flight.flight_no = next_no
+                next_no += 1
+                current[flight.flight_no] = flight
+                for planner in live:
+                    planner.add_flight(flight)
+            elif change < 0.7:
+                flight_no = rng.choice(list(current))
+                del current[flight_no]
+                for planner in live:
+                    planner.remove_flight(flight_no)
+            else:
+                flight = current[rng.choice(list(current))]
+                fare = rng.randint(50, 1000)
+                current[flight.flight_no] = Flight(flight.flight_no, flight.start_city, flight.departure_time,
+                                                   flight.end_city, flight.arrival_time, fare)
+                for planner in live:
+                    planner.update_fare(flight.flight_no, fare)
+            
+            fresh = Planner(list(current.values()))
+            for query in random_queries(rng, n_cities, 5, horizon):
+                for method in QUERY_METHODS:
+                    expected = objective(method, getattr(fresh, method)(*query))
+                    for planner in live:
+                        if objective(method, getattr(planner, method)(*query)) != expected:
+                            return False
+                if (objective("least_flights_earliest_route", live[0].least_flights_earliest_route(*query, bidirectional=True))
+                        != objective("least_flights_earliest_route", fresh.least_flights_earliest_route(*query))):
+                    return False
+            
+            start_city = rng.randrange(n_cities)
+            expected = {city: list(step) for city, step in fresh.profile(start_city).items()}
+            for planner in live:
+                if {city: list(step) for city, step in planner.profile(start_city).items()} != expected:
+                    return False
+    return True
+
+def check_search_modes(n_timetables=100, horizon=300):
+    """Cache, transfer patterns, trade-off frontier, k-best and profiles must agree with the three queries"""
+    rng = random.Random(12)
+    for seed in range(n_timetables):
+        n_cities = rng.randint(2, 6)
+        table = random_table(rng.randint(1, 20), n_cities, horizon, seed)
+        planner = Planner(table)
+        cached = Planner(table)
+        cached.enable_cache()
+        patterns = Planner(table)
+        patterns.use_transfer_patterns(TransferPatterns.build(patterns))
+        for query in random_queries(rng, n_cities, 10, horizon):
+            best = {method: objective(method, getattr(planner, method)(*query)) for method in QUERY_METHODS}
+            for method in QUERY_METHODS:
+                for other in (cached, patterns):
+                    if objective(method, getattr(other, method)(*query)) != best[method]:
+                        return False
+            
+            # Each query optimum is on the frontier, and the frontier beats none of them
+            frontier = planner.pareto_routes(*query)
+            for method in QUERY_METHODS:
+                if min((objective(method, route) for route in frontier), default=None) != (best[method] if frontier else None):
+                    return False
+            
+            cheapest = planner.k_cheapest_routes(*query, 1)
+            earliest = planner.k_earliest_routes(*query, 1)
+            if [objective("cheapest_route", route) for route in cheapest] != ([best["cheapest_route"]] if frontier else []):
+                return False
+            arrival = min((route[-1].arrival_time for route in frontier), default=float('inf'))
+            if (earliest[0][-1].arrival_time if earliest else float('inf')) != arrival:
+                return False
+            
+            start_city, end_city, t1, t2 = query
+            step = planner.profile(start_city, t1, t2).get(end_city)
+            if (step(t1) if step else float('inf')) != arrival:
+                return False
+    return True
+
+def loopless_routes(flights, start_city, end_city, t1, t2, min_connection_time=20):
+    """Every route from start_city to end_city in the window that visits no city twice, by exhaustive search"""
+    routes = []
+    def extend(route, visited):
+        city = route[-1].end_city if route else start_city
+        if city == end_city:
+            routes.append(list(route))
+            return
+        ready = route[-1].arrival_time + min_connection_time if route else t1
+        for flight in flights:
+            if (flight.start_city == city and flight.departure_time >= ready and
+                    flight.arrival_time <= t2 and flight.end_city not in visited):
+                route.append(flight)
+                extend(route, visited | {flight.end_city})
+                route.pop()
+    extend([], {start_city})
+    return routes
+
+def check_k_best(n_timetables=100, horizon=1440):
+    """k_cheapest_routes / k_earliest_routes must return the k best loopless routes"""
+    rng = random.Random(13)
+    for seed in range(n_timetables):
+        n_cities = rng.randint(3, 6)
+        flights = list(random_table(rng.randint(20, 60), n_cities, horizon, seed))
+        planner = Planner(flights)
+        for start_city, end_city, t1, t2 in random_queries(rng, n_cities, 5, horizon):
+            t2 += horizon
+            every = loopless_routes(flights, start_city, end_city, t1, t2)
+            k = rng.randint(1, 10)
+            cheapest_first = lambda route: (objective("cheapest_route", route), route[-1].arrival_time)
+            earliest_first = lambda route: (route[-1].arrival_time, objective("cheapest_route", route))
+            for method, key in ((planner.k_cheapest_routes, cheapest_first), (planner.k_earliest_routes, earliest_first)):
+                if [key(route) for route in method(start_city, end_city, t1, t2, k)] != sorted(map(key, every))[:k]:
+                    return False
+    return True
 
 def main():
     flights = [Flight(0, 0, 0, 1, 30, 50),      # City 0 to 1
@@ -14,29 +172,42 @@ def main():
                Flight(6, 3, 100, 4, 250, 300)   # City 3 to 4
                ]
     
-    flight_planner = Planner(flights)
-    
-    # The three tasks
-    route1 = flight_planner.least_flights_earliest_route(0, 4, 0, 300)
-    route2 = flight_planner.cheapest_route(0, 4, 0, 300)
-    route3 = flight_planner.least_flights_cheapest_route(0, 4, 0, 300)
-    
     # model output
     expected_route1 = [flights[1], flights[5]]                  # 0-3-4, 2 flights, arrives at t=150
     expected_route2 = [flights[0], flights[3], flights[4]]      # 0-1-2-4, 270 fare
     expected_route3 = [flights[1], flights[6]]                  # 0-3-4, 2 flights, 500 fare
     
-    # Note that for this given example there is a unique solution, but it may
-    # not be true in general
-    if route1 == expected_route1:
-        print("Task 1 PASSED")
+    for engine in ("graph", "csa"):
+        flight_planner = Planner(flights, engine=engine)
         
-    if route2 == expected_route2:
-        print("Task 2 PASSED")
-        
-    if route3 == expected_route3:
-        print("Task 3 PASSED")
+        # The three tasks
+        route1 = flight_planner.least_flights_earliest_route(0, 4, 0, 300)
+        route2 = flight_planner.cheapest_route(0, 4, 0, 300)
+        route3 = flight_planner.least_flights_cheapest_route(0, 4, 0, 300)
         
+        # Note that for this given example there is a unique solution, but it may
+        # not be true in general
+        if route1 == expected_route1:
+            print(f"[{engine}] Task 1 PASSED")
+            
+        if route2 == expected_route2:
+            print(f"[{engine}] Task 2 PASSED")
+            
+        if route3 == expected_route3:
+            print(f"[{engine}] Task 3 PASSED")
+    
+    # Search modes beyond the three tasks, on seeded random timetables
+    if check_bidirectional():
+        print("Task 4 PASSED")
+    
+    if check_live_updates():
+        print("Task 5 PASSED")
+    
+    if check_search_modes():
+        print("Task 6 PASSED")
+    
+    if check_k_best():
+        print("Task 7 PASSED")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,159 +1,938 @@
 from flight import Flight
+from flight_table import FlightTable
+from connection_scan import ConnectionScan
+from query_cache import QueryCache
+from search_stats import SearchStats
+from transfer_patterns import timetable_fingerprint
 import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+import multiprocessing
+import os
+import time
 from collections import deque, defaultdict
 
+ENGINES = ("graph", "csa")
+MIN_CONNECTION_TIME = 20  # Default layover between two flights
+QUERY_METHODS = ("least_flights_earliest_route", "cheapest_route", "least_flights_cheapest_route")
+
+# Index-returning search behind each query method
+_SEARCHES = {
+    "least_flights_earliest_route": "_least_flights_earliest",
+    "cheapest_route": "_cheapest",
+    "least_flights_cheapest_route": "_least_flights_cheapest",
+}
+
+class SearchCancelled(Exception):
+    """Raised inside a graph search when the planner's cancel_event is set"""
+
+
 class Planner:
-    def __init__(self, flights):
-        """Initialize the planner with flight data"""
-        # Build adjacency list for graph representation
-        self.graph = defaultdict(list)
-        for flight in flights:
-            self.graph[flight.start_city].append(flight)
+    def __init__(self, flights, engine="graph", min_connection_time=MIN_CONNECTION_TIME):
+        """
+        Initialize the planner with flight data
+        
+        min_connection_time is either one layover (in minutes) for every city, or a
+        dict city -> minutes; cities missing from the dict use MIN_CONNECTION_TIME
+
+        flights is either a list of Flight objects or a FlightTable. Given a
+        FlightTable no per-flight objects are built; Flight views are made only
+        for the flights of the routes that are returned
+
+        engine selects how queries are answered:
+            "graph" - BFS / Dijkstra over the per-city adjacency list
+            "csa"   - connection scan over one departure-sorted flight array
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+        self.engine = engine
+        
+        # Searches read the typed columns; self.flights only materializes results.
+        # A caller's FlightTable is shared until the first schedule change, which
+        # copies it (see _own_table) so the caller and other planners never see it
+        if isinstance(flights, FlightTable):
+            self.flights = flights
+            self.table = flights
+            self._owns_table = False
+        else:
+            self.flights = list(flights)
+            self.table = FlightTable.from_flights(self.flights)
+            self._owns_table = True
+        table = self.table
+        
+        # Minimum connection time per city, as a dense array read with one index
+        if isinstance(min_connection_time, dict):
+            default, overrides = MIN_CONNECTION_TIME, min_connection_time
+        else:
+            default, overrides = min_connection_time, {}
+        # A grouped table names every city in city_ranges, so a mapped file is sized
+        # without reading its columns; cities added later grow the table (_cover_city)
+        if table.city_ranges is not None:
+            n_cities = max(table.city_ranges, default=-1) + 1
+        else:
+            n_cities = max(max(table.start_city, default=-1), max(table.end_city, default=-1)) + 1
+        n_cities = max(n_cities, max(overrides, default=-1) + 1)
+        self.default_connection_time = default
+        self.mct = array('q', [default]) * n_cities
+        for city, minutes in overrides.items():
+            self.mct[city] = minutes
+        
+        self.csa = ConnectionScan(table, self.mct) if engine == "csa" else None
+        
+        # flight_no -> row index, built on the first schedule change
+        self._rows = None
+        
+        # Per city incoming flights sorted by arrival, built on the first backward search
+        self._incoming = None
+        
+        # Bumped by every schedule change; part of every cache key
+        self.version = 0
+        self.cache = None
+        
+        # Opt-in work counters, the counters of the search that just ran, and the
+        # flights yielded by _feasible / _feasible_in during it
+        self.stats = None
+        self._counts = None
+        self._relaxations = 0
+        
+        # Transfer-pattern index and the version it is valid for
+        self.patterns = None
+        self._patterns_version = None
+        
+        # Optional threading.Event; graph searches stop with SearchCancelled once it is set
+        self.cancel_event = None
+        
+        # Connection scan over the live flights for profile queries: the csa engine's,
+        # or one built on the first profile and then kept current like self.csa
+        self._scan = self.csa
+        
+        # Build adjacency list of flight indices for graph representation
+        if table.city_ranges is not None:
+            self._index_grouped(table)
+        else:
+            self._index(table)
+    
+    def enable_cache(self, maxsize=1024, ttl=None):
+        """Cache route query results (LRU, optional TTL in seconds); see QueryCache"""
+        self.cache = QueryCache(maxsize, ttl)
+        return self.cache
+    
+    def enable_stats(self):
+        """Record work counters and wall time for every route query; see SearchStats"""
+        self.stats = SearchStats()
+        # Relaxations are counted by shadowing the flight scans on this instance only,
+        # so planners without stats run the plain scans
+        self._feasible = self._feasible_counted
+        self._feasible_in = self._feasible_in_counted
+        return self.stats
+    
+    def _feasible_counted(self, *args):
+        for i in Planner._feasible(self, *args):
+            self._relaxations += 1
+            yield i
+    
+    def _feasible_in_counted(self, *args):
+        for i in Planner._feasible_in(self, *args):
+            self._relaxations += 1
+            yield i
+    
+    def _count(self, pushes, pops, pruned, peak_queue, relaxations=None):
+        """
+        Hand the counters of the search that just ran to the query being recorded
+        relaxations defaults to the flights the scans yielded during the search
+        """
+        if self.stats is not None:
+            if relaxations is None:
+                relaxations = self._relaxations
+            self._counts = (pushes, pops, relaxations, pruned, peak_queue)
+    
+    def use_transfer_patterns(self, patterns):
+        """
+        Answer route queries inside a precomputed TransferPatterns index
+        The index must have been built from this timetable; after any schedule
+        change queries fall back to live search until a fresh index is attached
+        """
+        if patterns.fingerprint != timetable_fingerprint(self):
+            raise ValueError("Transfer patterns were built from a different timetable")
+        self.patterns = patterns
+        self._patterns_version = self.version
+    
+    def _index(self, table):
+        graph = defaultdict(list)
+        for i, city in enumerate(table.start_city):
+            graph[city].append(i)
+        
+        # Sort flights by departure time for each city for efficiency, and keep a
+        # parallel array of departure times so expansions can bisect into the list
+        departure = table.departure_time
+        self.graph = {}
+        self.departures = {}
+        for city, out in graph.items():
+            out.sort(key=departure.__getitem__)
+            self.graph[city] = array('q', out)
+            self.departures[city] = array('q', (departure[i] for i in out))
+    
+    def _index_grouped(self, table):
+        # Rows are already grouped by city and sorted by departure, so each city's
+        # flights are a contiguous row range and its departures a slice of the column
+        self.graph = {}
+        self.departures = {}
+        for city, (lo, hi) in table.city_ranges.items():
+            self.graph[city] = range(lo, hi)
+            self.departures[city] = table.departure_time[lo:hi]
+    
+    def set_min_connection_time(self, city, minutes):
+        """Change one city's minimum connection time in the live planner"""
+        self._cover_city(city)
+        self.mct[city] = minutes
+        self.version += 1
+    
+    def _cover_city(self, city):
+        """Grow the connection-time table so that city has an entry"""
+        if city >= len(self.mct):
+            self.mct.extend([self.default_connection_time] * (city + 1 - len(self.mct)))
+    
+    def add_flight(self, flight):
+        """
+        Add a flight to the live timetable and return its row index
+        The flight is inserted into its city's sorted index (and the connection
+        scan arrays) in place, without rebuilding anything
+        """
+        rows = self._flight_rows()
+        if flight.flight_no in rows:
+            raise ValueError(f"Flight {flight.flight_no} already exists")
+        
+        self._cover_city(max(flight.start_city, flight.end_city))
+        table = self._own_table()
+        i = table.append(flight.flight_no, flight.start_city, flight.departure_time,
+                         flight.end_city, flight.arrival_time, flight.fare)
+        if self.flights is not table:
+            self.flights.append(flight)
+        rows[flight.flight_no] = i
+        
+        out, departures = self._city_index(flight.start_city)
+        k = bisect_right(departures, flight.departure_time)
+        out.insert(k, i)
+        departures.insert(k, flight.departure_time)
+        
+        if self._incoming is not None:
+            into, arrivals = self._incoming_city(flight.end_city)
+            k = bisect_right(arrivals, flight.arrival_time)
+            into.insert(k, i)
+            arrivals.insert(k, flight.arrival_time)
+        
+        if self._scan is not None:
+            self._scan.insert(table, i)
+        self.version += 1
+        return i
+    
+    def remove_flight(self, flight_no):
+        """Remove a flight from the live timetable; its table row is left unused"""
+        rows = self._flight_rows()
+        if flight_no not in rows:
+            raise ValueError(f"Flight {flight_no} does not exist")
+        i = rows.pop(flight_no)
+        
+        table = self.table
+        departure_time = table.departure_time[i]
+        out, departures = self._city_index(table.start_city[i])
+        k = bisect_left(departures, departure_time)
+        while out[k] != i:
+            k += 1
+        del out[k]
+        del departures[k]
         
-        # Sort flights by departure time for each city for efficiency
-        for city in self.graph:
-            self.graph[city].sort(key=lambda f: f.departure_time)
+        if self._incoming is not None:
+            into, arrivals = self._incoming_city(table.end_city[i])
+            k = bisect_left(arrivals, table.arrival_time[i])
+            while into[k] != i:
+                k += 1
+            del into[k]
+            del arrivals[k]
+        
+        if self._scan is not None:
+            self._scan.remove(i, departure_time)
+        self.version += 1
+    
+    def update_fare(self, flight_no, fare):
+        """Change the fare of a flight in the live timetable"""
+        rows = self._flight_rows()
+        if flight_no not in rows:
+            raise ValueError(f"Flight {flight_no} does not exist")
+        i = rows[flight_no]
+        
+        table = self._own_table()
+        table.fare[i] = fare
+        if self.flights is not table:
+            # A new Flight, so the caller's object keeps its fare
+            self.flights[i] = table[i]
+        
+        if self._scan is not None:
+            self._scan.update_fare(i, table.departure_time[i], fare)
+        self.version += 1
+    
+    def _own_table(self):
+        """Return the planner's own writable table, copying a caller's FlightTable on the first change"""
+        if not self._owns_table:
+            table = self.table.copy()
+            if self.flights is self.table:
+                self.flights = table
+            self.table = table
+            self._owns_table = True
+        return self.table
+    
+    def _flight_rows(self):
+        if self._rows is None:
+            self._rows = {flight_no: i for i, flight_no in enumerate(self.table.flight_no)}
+        return self._rows
+    
+    def _city_index(self, city):
+        """Return the city's (flight indices, departures) pair as mutable arrays"""
+        out = self.graph.get(city)
+        if out is None:
+            self.graph[city] = array('q')
+            self.departures[city] = array('q')
+        elif not isinstance(out, array):
+            # Row range / mapped slice from a grouped table: copy this city only
+            self.graph[city] = array('q', out)
+            self.departures[city] = array('q', self.departures[city])
+        return self.graph[city], self.departures[city]
+    
+    def _feasible(self, city, min_departure, t2, legs=None):
+        """
+        Yield indices of flights leaving city at or after min_departure and departing by t2
+        legs optionally maps city -> allowed next cities (a transfer-pattern restriction)
+        Every graph search expands a city through here, so this is where cancel_event is checked
+        """
+        cancel = self.cancel_event
+        if cancel is not None and cancel.is_set():
+            raise SearchCancelled()
+        out = self.graph.get(city)
+        if not out:
+            return
+        departures = self.departures[city]
+        if legs is None:
+            for k in range(bisect_left(departures, min_departure), len(out)):
+                if departures[k] > t2:
+                    return
+                yield out[k]
+            return
+        
+        allowed = legs.get(city)
+        if not allowed:
+            return
+        end = self.table.end_city
+        for k in range(bisect_left(departures, min_departure), len(out)):
+            if departures[k] > t2:
+                return
+            if end[out[k]] in allowed:
+                yield out[k]
+    
+    def _incoming_city(self, city):
+        """Return the city's (incoming flight indices, arrivals) pair, building the index if needed"""
+        if self._incoming is None:
+            table = self.table
+            arrival = table.arrival_time
+            incoming = defaultdict(list)
+            for i, city_in in enumerate(table.end_city):
+                incoming[city_in].append(i)
+            self._incoming = {}
+            rows = self._rows
+            for city_in, into in incoming.items():
+                if rows is not None:
+                    # Removed flights keep their table rows; leave them out
+                    into = [i for i in into if rows.get(table.flight_no[i]) == i]
+                into.sort(key=arrival.__getitem__)
+                self._incoming[city_in] = (array('q', into), array('q', (arrival[i] for i in into)))
+        if city not in self._incoming:
+            self._incoming[city] = (array('q'), array('q'))
+        return self._incoming[city]
+    
+    def _feasible_in(self, city, max_arrival, t1):
+        """Yield indices of flights arriving at city by max_arrival and departing at or after t1, latest arrival first"""
+        cancel = self.cancel_event
+        if cancel is not None and cancel.is_set():
+            raise SearchCancelled()
+        into, arrivals = self._incoming_city(city)
+        departure = self.table.departure_time
+        for k in range(bisect_right(arrivals, max_arrival) - 1, -1, -1):
+            if arrivals[k] < t1:
+                return
+            i = into[k]
+            if departure[i] >= t1:
+                yield i
+    
+    @staticmethod
+    def _trace(pred_flight, pred_parent, record):
+        """Walk predecessor records back from record and return the route as flight indices"""
+        route = []
+        while record != -1:
+            route.append(pred_flight[record])
+            record = pred_parent[record]
+        route.reverse()
+        return route
+    
+    def _query(self, search, start_city, end_city, t1, t2):
+        """Run the named index-returning search, recording its work when stats are enabled"""
+        if self.stats is None:
+            return self._lookup(search, start_city, end_city, t1, t2)
+        
+        self._counts = None
+        self._relaxations = 0
+        begin = time.perf_counter()
+        route = self._lookup(search, start_city, end_city, t1, t2)
+        counts = self._counts or (0, 0, self._relaxations, 0, 0)
+        self.stats.record(search, time.perf_counter() - begin, counts)
+        return route
+    
+    def _lookup(self, search, start_city, end_city, t1, t2):
+        """Run the named index-returning search, through the cache when one is enabled"""
+        if self.cache is None:
+            return self._search(search, start_city, end_city, t1, t2)
+        
+        # Every route starts with a flight out of start_city, so any t1 up to that
+        # city's next departure gives the same answer
+        departures = self.departures.get(start_city)
+        if departures:
+            k = bisect_left(departures, t1)
+            if k < len(departures):
+                t1 = departures[k]
+        
+        key = (search, start_city, end_city, t1, t2, self.version)
+        hit, route = self.cache.get(key)
+        if not hit:
+            route = self._search(search, start_city, end_city, t1, t2)
+            self.cache.put(key, route)
+        return route
+    
+    def _search(self, search, start_city, end_city, t1, t2):
+        """Run the named search, inside the transfer patterns when a current index is attached"""
+        if self.patterns is None or self._patterns_version != self.version:
+            return getattr(self, search)(start_city, end_city, t1, t2)
+        
+        legs = self.patterns.legs.get((start_city, end_city))
+        if legs is None:
+            return []  # No optimal journey for any window, so no route at all
+        return getattr(self, search)(start_city, end_city, t1, t2, legs)
+    
+    def _route(self, indices):
+        """Materialize a list of flight indices as flights"""
+        flights = self.flights
+        return [flights[i] for i in indices]
     
-    def least_flights_earliest_route(self, start_city, end_city, t1, t2):
+    def least_flights_earliest_route(self, start_city, end_city, t1, t2, bidirectional=False):
         """
         Find route with minimum flights, breaking ties by earliest arrival
-        Uses BFS for optimal solution
+        Uses BFS for optimal solution, or with bidirectional=True a search that
+        grows hop levels from both ends and meets in the middle
         """
+        search = "_least_flights_earliest_bidirectional" if bidirectional else "_least_flights_earliest"
+        return self._route(self._query(search, start_city, end_city, t1, t2))
+    
+    def cheapest_route(self, start_city, end_city, t1, t2):
+        """
+        Find route with minimum total fare
+        Uses Dijkstra's algorithm
+        """
+        return self._route(self._query("_cheapest", start_city, end_city, t1, t2))
+    
+    def least_flights_cheapest_route(self, start_city, end_city, t1, t2):
+        """
+        Find route with minimum flights, breaking ties by minimum cost
+        Uses modified Dijkstra with lexicographic ordering
+        """
+        return self._route(self._query("_least_flights_cheapest", start_city, end_city, t1, t2))
+    
+    def pareto_routes(self, start_city, end_city, t1, t2):
+        """
+        Find every route on the (arrival time, total fare, number of flights) trade-off frontier
+        Uses multi-criteria label-setting search, dropping labels dominated at their city
+        Routes are returned in order of arrival time
+        """
+        return [self._route(indices) for indices in self._pareto(start_city, end_city, t1, t2)]
+    
+    def k_cheapest_routes(self, start_city, end_city, t1, t2, k):
+        """
+        Find the k routes with the lowest total fare, cheapest first
+        Ties are broken by earliest arrival; no route visits a city twice
+        """
+        return [self._route(indices) for indices in self._k_best(start_city, end_city, t1, t2, k, True)]
+    
+    def k_earliest_routes(self, start_city, end_city, t1, t2, k):
+        """
+        Find the k routes with the earliest arrival, earliest first
+        Ties are broken by lowest total fare; no route visits a city twice
+        """
+        return [self._route(indices) for indices in self._k_best(start_city, end_city, t1, t2, k, False)]
+    
+    def profile(self, start_city, t1=0, t2=float('inf')):
+        """
+        Find the earliest arrival at every city for every departure time from start_city
+        Returns a dict city -> StepFunction; calling it with a departure time t gives
+        the earliest arrival when leaving start_city at or after t
+        Uses one connection scan over the departure-sorted flights
+        """
+        return self._connection_scan().profile(start_city, t1, t2)
+    
+    def _connection_scan(self):
+        """The departure-sorted scan of the live flights, built on first use"""
+        if self._scan is None:
+            rows = None
+            if self._rows is not None:
+                rows = sorted(self._rows.values())  # Leave out removed flights
+            self._scan = ConnectionScan(self.table, self.mct, rows)
+        return self._scan
+    
+    def _least_flights_earliest(self, start_city, end_city, t1, t2, legs=None):
         if start_city == end_city:
             return []
         
-        # BFS queue: (num_flights, current_time, city, path)
-        queue = deque([(0, t1, start_city, [])])
+        if self.csa is not None and legs is None:
+            route = self.csa.route(start_city, end_city, t1, t2, "hops")
+            self._count(*self.csa.counts)
+            return route
+        
+        table = self.table
+        arrival, end = table.arrival_time, table.end_city
+        mct = self.mct
+        
+        # Predecessor records: flight index taken and the record it extends (-1 = start)
+        pred_flight = array('q')
+        pred_parent = array('q')
         
-        # Track best state for each city: (min_flights, earliest_time_for_min_flights)
-        best_state = {}
+        # BFS queue: (num_flights, current_time, city, record)
+        queue = deque([(0, t1, start_city, -1)])
+        
+        # Earliest arrival among the states already expanded at each city
+        best_time = {}
         
         min_flights = float('inf')
-        best_route = None
+        best_record = None
         best_arrival_time = float('inf')
         
+        # Work counters for SearchStats
+        pops = expanded = peak_queue = 0
+        
         while queue:
-            num_flights, current_time, city, path = queue.popleft()
+            num_flights, current_time, city, record = queue.popleft()
+            pops += 1
             
             # Pruning: if we already found a solution with fewer flights, skip
             if num_flights > min_flights:
                 continue
             
-            # State pruning: skip if we've seen this city with better or equal state
-            if city in best_state:
-                prev_flights, prev_time = best_state[city]
-                if prev_flights < num_flights or (prev_flights == num_flights and prev_time <= current_time):
-                    continue
+            # State pruning: BFS pops states in order of flights, so an expanded state
+            # that arrived no later dominates this one. A state with more flights but an
+            # earlier arrival is kept: it may make connections the fewer-flight one misses
+            if city in best_time and best_time[city] <= current_time:
+                continue
             
-            best_state[city] = (num_flights, current_time)
+            best_time[city] = current_time
+            expanded += 1
             
             # Check if we reached destination
             if city == end_city:
                 if num_flights < min_flights or (num_flights == min_flights and current_time < best_arrival_time):
                     min_flights = num_flights
                     best_arrival_time = current_time
-                    best_route = path[:]
+                    best_record = record
                 continue
             
             # Explore neighbors
-            for flight in self.graph[city]:
+            min_departure = max(current_time + (mct[city] if num_flights else 0), t1)
+            for i in self._feasible(city, min_departure, t2, legs):
                 # Check time constraints
-                min_departure = current_time + (20 if path else 0)  # 20 min connection time
-                
-                if (flight.departure_time >= max(min_departure, t1) and 
-                    flight.arrival_time <= t2):
-                    
-                    new_path = path + [flight]
-                    queue.append((num_flights + 1, flight.arrival_time, flight.end_city, new_path))
+                if arrival[i] <= t2:
+                    pred_flight.append(i)
+                    pred_parent.append(record)
+                    queue.append((num_flights + 1, arrival[i], end[i], len(pred_flight) - 1))
+            peak_queue = max(peak_queue, len(queue))
         
-        return best_route if best_route else []
+        self._count(len(pred_flight) + 1, pops, pops - expanded, peak_queue)
+        if best_record is None:
+            return []
+        return self._trace(pred_flight, pred_parent, best_record)
     
-    def cheapest_route(self, start_city, end_city, t1, t2):
-        """
-        Find route with minimum total fare
-        Uses Dijkstra's algorithm
-        """
+    def _least_flights_earliest_bidirectional(self, start_city, end_city, t1, t2, legs=None):
+        if start_city == end_city:
+            return []
+        
+        table = self.table
+        departure, arrival = table.departure_time, table.arrival_time
+        start, end = table.start_city, table.end_city
+        mct = self.mct
+        
+        # Forward labels: earliest arrival at each city using at most k flights.
+        # Each city keeps its improvements as (k, arrival, flight) for path recovery
+        fwd = {start_city: [(0, t1, -1)]}
+        best_fwd = {start_city: t1}
+        frontier_f = [(start_city, t1)]
+        kf = 0
+        
+        # Backward labels: latest arrival at each city from which end_city is still
+        # reachable by t2 using at most j more flights
+        bwd = {end_city: [(0, t2, -1)]}
+        best_bwd = {end_city: t2}
+        frontier_b = [(end_city, t2)]
+        jb = 0
+        
+        def meets(city):
+            if city not in best_fwd or city not in best_bwd:
+                return False
+            # No connection time at the ends: the start label is the trip's beginning
+            # and the end label only asks to arrive by t2
+            return city == start_city or city == end_city or best_fwd[city] <= best_bwd[city]
+        
+        # Phase 1: grow the smaller side one hop level at a time until the sides meet
+        while True:
+            if not frontier_f and not frontier_b:
+                return []
+            
+            if frontier_f and (not frontier_b or len(frontier_f) <= len(frontier_b)):
+                kf += 1
+                improved = {}
+                for u, current_time in frontier_f:
+                    if u == end_city:
+                        continue
+                    min_departure = t1 if kf == 1 else max(current_time + mct[u], t1)
+                    for i in self._feasible(u, min_departure, t2, legs):
+                        arr = arrival[i]
+                        v = end[i]
+                        if arr <= t2 and arr < best_fwd.get(v, arr + 1) and arr < improved.get(v, (arr + 1,))[0]:
+                            improved[v] = (arr, i)
+                for v, (arr, i) in improved.items():
+                    best_fwd[v] = arr
+                    fwd.setdefault(v, []).append((kf, arr, i))
+                frontier_f = [(v, arr) for v, (arr, i) in improved.items()]
+                grown = frontier_f
+            else:
+                jb += 1
+                improved = {}
+                for w, latest in frontier_b:
+                    if w == start_city:
+                        continue
+                    for i in self._feasible_in(w, latest, t1):
+                        u = start[i]
+                        ready = departure[i] - mct[u]
+                        if ready > best_bwd.get(u, ready - 1) and ready > improved.get(u, (ready - 1,))[0]:
+                            improved[u] = (ready, i)
+                for u, (ready, i) in improved.items():
+                    best_bwd[u] = ready
+                    bwd.setdefault(u, []).append((jb, ready, i))
+                frontier_b = [(u, ready) for u, (ready, i) in improved.items()]
+                grown = frontier_b
+            
+            # A meet can only appear at a city whose label just improved
+            if any(meets(city) for city, _ in grown):
+                break
+        
+        # Minimum number of flights: the first level sum at which the sides meet
+        hops = kf + jb
+        
+        def latest_allowed(city, j):
+            """Backward label of city using at most j flights, or None"""
+            value = None
+            for level, ready, _ in bwd.get(city, ()):
+                if level > j:
+                    break
+                value = ready
+            return value
+        
+        # Phase 2: finish the forward levels up to hops, keeping only labels that
+        # the backward levels show can still reach end_city in the flights left
+        for k in range(kf + 1, hops + 1):
+            improved = {}
+            for u, current_time in frontier_f:
+                if u == end_city:
+                    continue
+                min_departure = t1 if k == 1 else max(current_time + mct[u], t1)
+                for i in self._feasible(u, min_departure, t2, legs):
+                    arr = arrival[i]
+                    v = end[i]
+                    if arr > t2 or arr >= best_fwd.get(v, arr + 1) or arr >= improved.get(v, (arr + 1,))[0]:
+                        continue
+                    allowed = latest_allowed(v, hops - k)
+                    if allowed is not None and arr <= allowed:
+                        improved[v] = (arr, i)
+            for v, (arr, i) in improved.items():
+                best_fwd[v] = arr
+                fwd.setdefault(v, []).append((k, arr, i))
+            frontier_f = [(v, arr) for v, (arr, i) in improved.items()]
+        
+        # Walk the forward improvements back from the destination
+        route = []
+        k, _, i = fwd[end_city][-1]
+        while i != -1:
+            route.append(i)
+            k -= 1
+            for level, _, parent in fwd[start[i]]:
+                if level == k:
+                    i = parent
+                    break
+        route.reverse()
+        return route
+    
+    def _cheapest(self, start_city, end_city, t1, t2, legs=None):
         if start_city == end_city:
             return []
         
-        # Priority queue: (total_fare, current_time, city, path)
-        pq = [(0, t1, start_city, [])]
+        if self.csa is not None and legs is None:
+            route = self.csa.route(start_city, end_city, t1, t2, "fare")
+            self._count(*self.csa.counts)
+            return route
+        
+        table = self.table
+        arrival, end, fare = table.arrival_time, table.end_city, table.fare
+        mct = self.mct
+        pred_flight = array('q')
+        pred_parent = array('q')
+        
+        # Priority queue: (total_fare, current_time, city, record)
+        pq = [(0, t1, start_city, -1)]
         
-        # Track minimum cost to reach each city at each time
-        # Key: (city, time), Value: min_cost
-        best_cost = {}
+        # Earliest arrival among the labels already settled at each city. Labels pop in
+        # fare order, so a settled label that arrived no later dominates the new one
+        best_time = {}
+        
+        # Work counters for SearchStats
+        pops = pruned = peak_queue = 0
         
         while pq:
-            total_fare, current_time, city, path = heapq.heappop(pq)
+            total_fare, current_time, city, record = heapq.heappop(pq)
+            pops += 1
             
             # Check if we reached destination
             if city == end_city:
-                return path
+                self._count(len(pred_flight) + 1, pops, pruned, peak_queue)
+                return self._trace(pred_flight, pred_parent, record)
             
-            # State pruning
-            state_key = (city, current_time)
-            if state_key in best_cost and best_cost[state_key] <= total_fare:
+            # Dominated-label pruning
+            if city in best_time and best_time[city] <= current_time:
+                pruned += 1
                 continue
-            best_cost[state_key] = total_fare
+            best_time[city] = current_time
             
             # Explore neighbors
-            for flight in self.graph[city]:
-                min_departure = current_time + (20 if path else 0)
-                
-                if (flight.departure_time >= max(min_departure, t1) and 
-                    flight.arrival_time <= t2):
-                    
-                    new_fare = total_fare + flight.fare
-                    new_path = path + [flight]
-                    heapq.heappush(pq, (new_fare, flight.arrival_time, flight.end_city, new_path))
+            min_departure = max(current_time + (mct[city] if record != -1 else 0), t1)
+            for i in self._feasible(city, min_departure, t2, legs):
+                if arrival[i] <= t2:
+                    pred_flight.append(i)
+                    pred_parent.append(record)
+                    heapq.heappush(pq, (total_fare + fare[i], arrival[i], end[i], len(pred_flight) - 1))
+            peak_queue = max(peak_queue, len(pq))
         
+        self._count(len(pred_flight) + 1, pops, pruned, peak_queue)
         return []
     
-    def least_flights_cheapest_route(self, start_city, end_city, t1, t2):
-        """
-        Find route with minimum flights, breaking ties by minimum cost
-        Uses modified Dijkstra with lexicographic ordering
-        """
+    def _least_flights_cheapest(self, start_city, end_city, t1, t2, legs=None):
         if start_city == end_city:
             return []
         
-        # Priority queue: (num_flights, total_fare, current_time, city, path)
-        pq = [(0, 0, t1, start_city, [])]
+        if self.csa is not None and legs is None:
+            route = self.csa.route(start_city, end_city, t1, t2, "hops_fare")
+            self._count(*self.csa.counts)
+            return route
         
-        # Track best state for each city: (min_flights, min_cost_for_min_flights)
-        best_state = {}
+        table = self.table
+        arrival, end, fare = table.arrival_time, table.end_city, table.fare
+        mct = self.mct
+        pred_flight = array('q')
+        pred_parent = array('q')
+        
+        # Priority queue: (num_flights, total_fare, current_time, city, record)
+        pq = [(0, 0, t1, start_city, -1)]
+        
+        # Earliest arrival among the labels already settled at each city. Labels pop in
+        # (flights, fare) order, so a settled label that arrived no later dominates the new one
+        best_time = {}
+        
+        # Work counters for SearchStats
+        pops = pruned = peak_queue = 0
         
         while pq:
-            num_flights, total_fare, current_time, city, path = heapq.heappop(pq)
+            num_flights, total_fare, current_time, city, record = heapq.heappop(pq)
+            pops += 1
             
             # Check if we reached destination
             if city == end_city:
-                return path
-            
-            # State pruning
-            if city in best_state:
-                prev_flights, prev_cost = best_state[city]
-                if (prev_flights < num_flights or 
-                    (prev_flights == num_flights and prev_cost <= total_fare)):
-                    continue
+                self._count(len(pred_flight) + 1, pops, pruned, peak_queue)
+                return self._trace(pred_flight, pred_parent, record)
             
-            best_state[city] = (num_flights, total_fare)
+            # Dominated-label pruning
+            if city in best_time and best_time[city] <= current_time:
+                pruned += 1
+                continue
+            best_time[city] = current_time
             
             # Explore neighbors
-            for flight in self.graph[city]:
-                min_departure = current_time + (20 if path else 0)
-                
-                if (flight.departure_time >= max(min_departure, t1) and 
-                    flight.arrival_time <= t2):
-                    
-                    new_flights = num_flights + 1
-                    new_fare = total_fare + flight.fare
-                    new_path = path + [flight]
-                    
-                    heapq.heappush(pq, (new_flights, new_fare, flight.arrival_time, 
-                                      flight.end_city, new_path))
+            min_departure = max(current_time + (mct[city] if num_flights else 0), t1)
+            for i in self._feasible(city, min_departure, t2, legs):
+                if arrival[i] <= t2:
+                    pred_flight.append(i)
+                    pred_parent.append(record)
+                    heapq.heappush(pq, (num_flights + 1, total_fare + fare[i], arrival[i],
+                                        end[i], len(pred_flight) - 1))
+            peak_queue = max(peak_queue, len(pq))
         
+        self._count(len(pred_flight) + 1, pops, pruned, peak_queue)
         return []
+    
+    def _pareto(self, start_city, end_city, t1, t2):
+        if start_city == end_city:
+            return []
+        
+        table = self.table
+        arrival, end, fare = table.arrival_time, table.end_city, table.fare
+        mct = self.mct
+        pred_flight = array('q')
+        pred_parent = array('q')
+        
+        # Priority queue: (current_time, total_fare, num_flights, city, record)
+        pq = [(t1, 0, 0, start_city, -1)]
+        
+        # Settled (fare, flights) pairs per city, all arriving no later than anything still queued
+        settled = defaultdict(list)
+        frontier = []
+        
+        while pq:
+            current_time, total_fare, num_flights, city, record = heapq.heappop(pq)
+            
+            # A label dominated at its own city or by a finished route cannot improve the frontier
+            if self._dominated(settled[city], total_fare, num_flights):
+                continue
+            if city != end_city and self._dominated(settled[end_city], total_fare, num_flights):
+                continue
+            settled[city].append((total_fare, num_flights))
+            
+            if city == end_city:
+                frontier.append(self._trace(pred_flight, pred_parent, record))
+                continue
+            
+            min_departure = max(current_time + (mct[city] if num_flights else 0), t1)
+            for i in self._feasible(city, min_departure, t2):
+                if arrival[i] <= t2:
+                    pred_flight.append(i)
+                    pred_parent.append(record)
+                    heapq.heappush(pq, (arrival[i], total_fare + fare[i], num_flights + 1,
+                                        end[i], len(pred_flight) - 1))
+        
+        return frontier
+    
+    def _k_best(self, start_city, end_city, t1, t2, k, by_fare):
+        # One label-setting search in which every city may settle several labels.
+        # Routes share prefixes through the predecessor records, so the k routes
+        # come out of a single search instead of k separate ones. Like Yen's k
+        # shortest paths, routes are loopless: a label never moves to a city
+        # already on its route
+        if start_city == end_city or k < 1:
+            return []
+        
+        table = self.table
+        arrival, end, fare = table.arrival_time, table.end_city, table.fare
+        mct = self.mct
+        pred_flight = array('q')
+        pred_parent = array('q')
+        
+        # Priority queue: (primary, secondary, city, record); primary is the fare
+        # for k-cheapest and the arrival time for k-earliest
+        pq = [(0, t1, start_city, -1) if by_fare else (t1, 0, start_city, -1)]
+        
+        # (arrival, fare, cities on the route) of the labels settled at each city. A
+        # settled label arriving no later, for no more, through no city the new one
+        # avoids completes every loop-free suffix of the new one at no extra cost;
+        # k of them dominate it
+        settled = defaultdict(list)
+        # Cities on the route of each expanded label, by record
+        route_cities = {-1: frozenset((start_city,))}
+        routes = []
+        
+        while pq:
+            primary, secondary, city, record = heapq.heappop(pq)
+            total_fare, current_time = (primary, secondary) if by_fare else (secondary, primary)
+            
+            if city == end_city:
+                routes.append(self._trace(pred_flight, pred_parent, record))
+                if len(routes) == k:
+                    break
+                continue
+            
+            if record == -1:
+                visited = route_cities[-1]
+            else:
+                visited = route_cities[pred_parent[record]] | {city}
+            if self._k_dominated(settled[city], k, current_time, total_fare, visited):
+                continue
+            settled[city].append((current_time, total_fare, visited))
+            route_cities[record] = visited
+            
+            min_departure = max(current_time + (mct[city] if record != -1 else 0), t1)
+            for i in self._feasible(city, min_departure, t2):
+                if arrival[i] <= t2 and end[i] not in visited:
+                    pred_flight.append(i)
+                    pred_parent.append(record)
+                    if by_fare:
+                        label = (total_fare + fare[i], arrival[i], end[i], len(pred_flight) - 1)
+                    else:
+                        label = (arrival[i], total_fare + fare[i], end[i], len(pred_flight) - 1)
+                    heapq.heappush(pq, label)
+        
+        return routes
+    
+    def batch_query(self, queries, objective, workers=None, chunksize=64):
+        """
+        Answer many (start_city, end_city, t1, t2) queries with a pool of worker processes
+        
+        objective is the name of one of the query methods, e.g. "cheapest_route".
+        Results are yielded as (position, route) pairs in completion order, where
+        position is the index of the query in queries. Workers share this planner
+        read-only: with the fork start method it is inherited rather than copied
+        """
+        if objective not in QUERY_METHODS:
+            raise ValueError(f"Unknown objective '{objective}', expected one of {QUERY_METHODS}")
+        
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            query = getattr(self, objective)
+            for position, q in enumerate(queries):
+                yield position, query(*q)
+            return
+        
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with context.Pool(workers, initializer=_init_worker, initargs=(self, objective)) as pool:
+            for position, indices in pool.imap_unordered(_run_query, enumerate(queries), chunksize):
+                yield position, self._route(indices)
+    
+    @staticmethod
+    def _dominated(labels, total_fare, num_flights):
+        """Check if any (fare, flights) label is no worse than the given one on both"""
+        for fare, hops in labels:
+            if fare <= total_fare and hops <= num_flights:
+                return True
+        return False
+    
+    @staticmethod
+    def _k_dominated(labels, k, current_time, total_fare, visited):
+        """Check if k (arrival, fare, cities) labels arrive no later, for no more, through no city outside visited"""
+        for arr, fare, cities in labels:
+            if arr <= current_time and fare <= total_fare and cities <= visited:
+                k -= 1
+                if k == 0:
+                    return True
+        return False
+
+
+# Per-process state for Planner.batch_query workers
+_worker_search = None
+
+def _init_worker(planner, objective):
+    global _worker_search
+    # Routes travel back as flight indices so the parent returns its own flights
+    _worker_search = getattr(planner, _SEARCHES[objective])
+
+def _run_query(item):
+    position, (start_city, end_city, t1, t2) = item
+    return position, _worker_search(start_city, end_city, t1, t2)
 
 
 # Additional utility classes if needed for custom implementations
@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        """ LRU cache for query results with an optional time-to-live
+
+        Args:
+            maxsize (int): Maximum number of cached results; the least recently used goes first
+            ttl (float): Seconds a result stays valid, or None to keep results until evicted
+            clock (callable): Time source, in seconds
+        """
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (value, expiry time or None)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return (True, value) on a hit and (False, None) on a miss"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        value, expiry = entry
+        if expiry is not None and self.clock() >= expiry:
+            del self.entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def put(self, key, value):
+        expiry = self.clock() + self.ttl if self.ttl is not None else None
+        self.entries[key] = (value, expiry)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,50 @@
+from collections import defaultdict
+
+# Work counters recorded for every query, in this order
+COUNTERS = ("pushes", "pops", "relaxations", "pruned", "peak_queue")
+
+
+def percentile(values, p):
+    """Nearest-rank p-th percentile of values (0 < p <= 100)"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = max(0, -(-len(ordered) * p // 100) - 1)
+    return ordered[int(k)]
+
+
+class SearchStats:
+    def __init__(self):
+        """ Per-query work counters and wall times collected from a Planner
+
+        Each record is (search, seconds, counters) where counters follows COUNTERS:
+            pushes      - labels added to the queue (for the csa engine: labels created)
+            pops        - labels taken off the queue
+            relaxations - flights examined while expanding labels (csa: connections scanned)
+            pruned      - popped labels dropped as dominated (csa: connections not labelled)
+            peak_queue  - largest queue size during the search
+        Queries answered from the cache record zeros, and searches without a
+        queue (e.g. the bidirectional one) record only relaxations
+        """
+        self.records = []
+
+    def record(self, search, seconds, counters):
+        self.records.append((search, seconds, counters))
+
+    def clear(self):
+        self.records.clear()
+
+    def summary(self):
+        """Return search -> {queries, p50 and p99 wall time, mean of every counter}"""
+        by_search = defaultdict(list)
+        for search, seconds, counters in self.records:
+            by_search[search].append((seconds, counters))
+
+        summary = {}
+        for search, records in by_search.items():
+            times = [seconds for seconds, _ in records]
+            row = {"queries": len(records), "p50": percentile(times, 50), "p99": percentile(times, 99)}
+            for k, name in enumerate(COUNTERS):
+                row[name] = sum(counters[k] for _, counters in records) / len(records)
+            summary[search] = row
+        return summary
@@ -0,0 +1,129 @@
+"""
+Bulk timetable loading for Planner
+
+CSV files hold one flight per row with the columns of COLUMNS, optionally
+preceded by a header row naming them (in any order).
+
+Binary timetables are laid out so they can be memory-mapped and used in
+place, with no parsing and no copying:
+
+    header      32 bytes: magic, format version, byte order, row count, city count
+    city table  city count x 3 int64: (city, lo, hi), the row range of each city's
+                departures (empty for a city with arrivals only)
+    columns     one block of row count int64 per name in COLUMNS
+
+Rows are ordered by (start_city, departure_time), which is exactly the
+per-city index Planner needs, so a planner over a mapped file starts
+without sorting anything. Every process that opens the same file shares
+its pages through the OS page cache.
+"""
+import csv
+import mmap
+import struct
+import sys
+from array import array
+from flight_table import COLUMNS, FlightTable
+
+MAGIC = b"FLTB"
+VERSION = 2
+HEADER = struct.Struct("<4sIc7xQQ")  # 32 bytes, so every int64 block stays aligned
+BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+
+def load_csv(path, chunk_rows=1 << 16):
+    """
+    Stream a CSV timetable into a FlightTable
+
+    Rows are parsed in chunks of chunk_rows and appended to the typed
+    columns, so no Flight objects or whole-file row lists are built
+    """
+    table = FlightTable()
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return table
+
+        if set(name.strip() for name in first) == set(COLUMNS):
+            positions = [[name.strip() for name in first].index(column) for column in COLUMNS]
+            rows = reader
+        else:
+            positions = list(range(len(COLUMNS)))
+            rows = _chain(first, reader)
+
+        targets = [getattr(table, column) for column in COLUMNS]
+        buffers = [[] for _ in COLUMNS]
+        for row in rows:
+            if not row:
+                continue
+            for buffer, p in zip(buffers, positions):
+                buffer.append(int(row[p]))
+            if len(buffers[0]) >= chunk_rows:
+                _flush(targets, buffers)
+        _flush(targets, buffers)
+    return table
+
+
+def save_binary(table, path):
+    """Write table as a memory-mappable binary timetable"""
+    if table.city_ranges is None:
+        table = table.grouped_by_city()
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER, len(table), len(table.city_ranges)))
+        cities = array('q')
+        for city, (lo, hi) in sorted(table.city_ranges.items()):
+            cities.extend((city, lo, hi))
+        cities.tofile(f)
+        for column in COLUMNS:
+            f.write(memoryview(getattr(table, column)).cast('B'))
+
+
+def open_binary(path):
+    """
+    Memory-map a binary timetable and return a read-only FlightTable over it
+
+    The columns are memoryviews into the mapping, so opening is O(cities)
+    regardless of the number of flights
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, byte_order, n_rows, n_cities = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} binary timetable")
+    if byte_order != BYTE_ORDER:
+        raise ValueError(f"{path} was written on a machine with a different byte order")
+
+    words = memoryview(data).cast('q')
+    offset = HEADER.size // 8
+
+    city_ranges = {}
+    for k in range(n_cities):
+        city, lo, hi = words[offset + 3 * k: offset + 3 * k + 3]
+        city_ranges[city] = (lo, hi)
+    offset += 3 * n_cities
+
+    columns = {}
+    for column in COLUMNS:
+        columns[column] = words[offset: offset + n_rows]
+        offset += n_rows
+    return FlightTable.from_buffers(columns, city_ranges)
+
+
+def _chain(first, rows):
+    yield first
+    yield from rows
+
+
+def _flush(targets, buffers):
+    for target, buffer in zip(targets, buffers):
+        target.extend(buffer)
+        buffer.clear()
+
+
+if __name__ == "__main__":
+    # python timetable_io.py flights.csv flights.bin
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python timetable_io.py <timetable.csv> <timetable.bin>")
+    save_binary(load_csv(sys.argv[1]), sys.argv[2])
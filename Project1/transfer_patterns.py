@@ -0,0 +1,91 @@
+"""
+Precomputed transfer patterns for Planner
+
+For every origin city, one profile connection scan over (departure time,
+arrival time, total fare, number of flights) finds the optimal journeys to
+every destination for all departure times at once: the same journeys a
+Pareto search from each departure time would find. The legs (city pairs) of
+those journeys are stored per (origin, destination). Every query objective
+is monotone in these criteria, so an optimal route for any window (t1, t2)
+always exists inside the stored legs. A query then only has to search that
+small subgraph, and a pair with no stored legs has no route at all.
+
+The index is tied to the timetable it was built from by a fingerprint of
+the live flights, and Planner stops using it after any schedule change.
+
+Usage: python transfer_patterns.py <timetable.bin> <patterns.json>
+"""
+import json
+import sys
+import zlib
+from array import array
+
+
+def timetable_fingerprint(planner):
+    """CRC32 over the connection times and live flights of planner, city by city"""
+    table = planner.table
+    crc = zlib.crc32(planner.mct)
+    for city in sorted(planner.graph):
+        out = planner.graph[city]
+        if not out:
+            continue  # Cities without departures, however the index came to list them
+        crc = zlib.crc32(array('q', (city, len(out))), crc)
+        for column in (table.departure_time, table.arrival_time, table.end_city, table.fare):
+            crc = zlib.crc32(array('q', (column[i] for i in out)), crc)
+    return crc
+
+
+class TransferPatterns:
+    def __init__(self, legs, fingerprint):
+        """ Transfer-pattern index
+
+        Args:
+            legs (dict): (start_city, end_city) -> {city: set of next cities} over all optimal journeys
+            fingerprint (int): timetable_fingerprint of the timetable the index was built from
+        """
+        self.legs = legs
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, planner):
+        """Run the offline preprocessing: one profile scan per origin covers every departure time"""
+        start = planner.table.start_city
+        end = planner.table.end_city
+        scan = planner._connection_scan()
+        legs = {}
+        for origin, departures in planner.departures.items():
+            if not departures:
+                continue
+            for destination, routes in scan.pareto_profile(origin).items():
+                pattern = legs.setdefault((origin, destination), {})
+                for route in routes:
+                    for i in route:
+                        pattern.setdefault(start[i], set()).add(end[i])
+        return cls(legs, timetable_fingerprint(planner))
+
+    def save(self, path):
+        patterns = [
+            [origin, destination, [[u, sorted(vs)] for u, vs in sorted(pattern.items())]]
+            for (origin, destination), pattern in sorted(self.legs.items())
+        ]
+        with open(path, "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "patterns": patterns}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        legs = {
+            (origin, destination): {u: set(vs) for u, vs in pattern}
+            for origin, destination, pattern in data["patterns"]
+        }
+        return cls(legs, data["fingerprint"])
+
+
+if __name__ == "__main__":
+    from planner import Planner
+    from timetable_io import open_binary
+
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python transfer_patterns.py <timetable.bin> <patterns.json>")
+    TransferPatterns.build(Planner(open_binary(sys.argv[1]))).save(sys.argv[2])
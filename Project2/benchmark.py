@@ -0,0 +1,181 @@
+"""
+Benchmark HashSet collision modes at fixed load factors
+
+For every collision type and load factor, a table is sized so that n_keys
+n-grams fill it to exactly that load (no rehash happens), then reports the
+memory the table itself allocates per key and lookups/sec for an even mix of
+hits and misses. Keys and their hashes are built up front, so the numbers
+cover only the table's own structure and probing.
+
+A second table times HashMap inserts and lookups on long keys (whole
+sentences hashed by characters), where comparing stored hashes before keys
+and never rehashing keys on resize matter most.
+
+Finally report_similar_pairs runs exactly (over FingerprintSets, then again
+after freezing every document into a sorted FingerprintArray, then on a process
+pool with one worker per core) and through the MinHash/LSH
+candidate index at several band counts, on a corpus of n_docs random
+documents with planted near-duplicates, and reports time, candidate pairs
+and recall of the exact result, along with find_most_similar queries/sec
+through the inverted n-gram index.
+
+Usage: python benchmark.py [n_keys] [n_docs]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from hash_table import HashMap, HashSet, RollingHash, COLLISION_TYPES
+from plagiarism_engine import PlagiarismEngine
+
+LOAD_FACTORS = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+def random_ngrams(n_keys, n=3, vocabulary=5000, seed=0):
+    """Distinct space-joined n-grams over a random vocabulary"""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9)))
+             for _ in range(vocabulary)]
+    keys = set()
+    while len(keys) < n_keys:
+        keys.add(" ".join(rng.choice(words) for _ in range(n)))
+    return sorted(keys)
+
+
+def params(collision_type, table_size):
+    if collision_type == "Double":
+        return (257, 263, 97, table_size)
+    return (257, table_size)
+
+
+def measure(collision_type, load, keys, misses, rolling):
+    """Return (bytes per key, lookups/sec) for one collision type filled to load"""
+    hashed = [(rolling.key_hash(key), key) for key in keys]
+    probes = [(rolling.key_hash(key), key) for key in misses] + hashed[:len(misses)]
+
+    tracemalloc.start()
+    table = HashSet(collision_type, params(collision_type, int(len(keys) / load)), rolling.key_hash, max_load=1.0)
+    for h, key in hashed:
+        table.insert_hashed(key, h)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    begin = time.perf_counter()
+    for h, key in probes:
+        table.find_hashed(key, h)
+    elapsed = time.perf_counter() - begin
+    return size / len(keys), len(probes) / elapsed
+
+
+def long_keys(n_keys, words=40, seed=0):
+    """Distinct sentences of the given number of n-gram words, sharing long prefixes"""
+    rng = random.Random(seed)
+    prefix = " ".join(random_ngrams(words // 3, seed=seed))
+    return [f"{prefix} {i} {rng.random()}" for i in range(n_keys)]
+
+
+def measure_map(collision_type, keys):
+    """Return (inserts/sec, lookups/sec) for a HashMap grown from its default size"""
+    table = HashMap(collision_type, params(collision_type, 11))
+    begin = time.perf_counter()
+    for i, key in enumerate(keys):
+        table.insert(key, i)
+    inserted = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for key in keys:
+        table.find(key)
+    found = time.perf_counter() - begin
+    return len(keys) / inserted, len(keys) / found
+
+
+def corpus(n_docs, length=300, vocabulary=5000, seed=0):
+    """Random documents; every fourth one is a copy of an earlier one with some words changed"""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocabulary)]
+    docs = []
+    for i in range(n_docs):
+        if i % 4 == 3:
+            doc = list(docs[rng.randrange(i)])
+            for _ in range(rng.randint(1, length // 10)):
+                doc[rng.randrange(length)] = rng.choice(words)
+        else:
+            doc = [rng.choice(words) for _ in range(length)]
+        docs.append(doc)
+    return docs
+
+
+def compare_pairs(n_docs, threshold=0.5, n=3):
+    """Exact report_similar_pairs against the LSH candidate index at several band counts"""
+    docs = corpus(n_docs)
+    print(f"\nreport_similar_pairs, {n_docs} documents, threshold {threshold}")
+    print(f"{'search':<14} {'seconds':>10} {'candidates':>12} {'pairs':>8} {'recall':>8}")
+
+    engine = PlagiarismEngine("Chain", (257, 101), n)
+    for i, doc in enumerate(docs):
+        engine.add_document(f"doc{i}", doc)
+    begin = time.perf_counter()
+    exact = engine.report_similar_pairs(threshold)
+    elapsed = time.perf_counter() - begin
+    n_pairs = n_docs * (n_docs - 1) // 2
+    print(f"{'exact':<14} {elapsed:>10.2f} {n_pairs:>12} {len(exact):>8} {1:>8.3f}")
+    expected = {(t1, t2) for t1, t2, _ in exact}
+
+    engine.freeze()
+    begin = time.perf_counter()
+    frozen = engine.report_similar_pairs(threshold)
+    elapsed = time.perf_counter() - begin
+    recall = len({(t1, t2) for t1, t2, _ in frozen} & expected) / max(len(expected), 1)
+    print(f"{'exact frozen':<14} {elapsed:>10.2f} {n_pairs:>12} {len(frozen):>8} {recall:>8.3f}")
+
+    workers = max(os.cpu_count() or 1, 2)
+    begin = time.perf_counter()
+    parallel = engine.report_similar_pairs(threshold, workers=workers)
+    elapsed = time.perf_counter() - begin
+    recall = len({(t1, t2) for t1, t2, _ in parallel} & expected) / max(len(expected), 1)
+    name = f"exact x{workers}"
+    print(f"{name:<14} {elapsed:>10.2f} {n_pairs:>12} {len(parallel):>8} {recall:>8.3f}")
+
+    begin = time.perf_counter()
+    for i in range(n_docs):
+        engine.find_most_similar(f"doc{i}")
+    print(f"find_most_similar: {n_docs / (time.perf_counter() - begin):.0f} queries/sec")
+
+    for bands in (8, 16, 32, 64):
+        engine = PlagiarismEngine("Chain", (257, 101), n, bands=bands)
+        for i, doc in enumerate(docs):
+            engine.add_document(f"doc{i}", doc)
+        begin = time.perf_counter()
+        found = engine.report_similar_pairs(threshold, approximate=True)
+        elapsed = time.perf_counter() - begin
+        recall = len({(t1, t2) for t1, t2, _ in found} & expected) / max(len(expected), 1)
+        name = f"lsh {bands} bands"
+        print(f"{name:<14} {elapsed:>10.2f} {len(engine.lsh.candidate_pairs()):>12} {len(found):>8} {recall:>8.3f}")
+
+
+def main():
+    n_keys = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    ngrams = random_ngrams(2 * n_keys)
+    keys, misses = ngrams[::2], ngrams[1::2]
+    rolling = RollingHash(3)
+
+    print(f"{n_keys} keys")
+    print(f"{'collision':<10} {'load':>5} {'bytes/key':>10} {'lookups/sec':>12}")
+    for collision_type in COLLISION_TYPES:
+        for load in LOAD_FACTORS:
+            per_key, lps = measure(collision_type, load, keys, misses, rolling)
+            print(f"{collision_type:<10} {load:>5.1f} {per_key:>10.1f} {lps:>12.0f}")
+
+    keys = long_keys(n_keys // 5)
+    print(f"\nHashMap, {len(keys)} keys of {len(keys[0])} characters")
+    print(f"{'collision':<10} {'inserts/sec':>12} {'lookups/sec':>12}")
+    for collision_type in COLLISION_TYPES:
+        ips, lps = measure_map(collision_type, keys)
+        print(f"{collision_type:<10} {ips:>12.0f} {lps:>12.0f}")
+
+    compare_pairs(int(sys.argv[2]) if len(sys.argv) > 2 else 300)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from array import array
+from bisect import bisect_left
+from itertools import chain, islice
+from operator import eq
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def intersection_size(a, b):
+    # Number of values shared by two sorted sequences of distinct 64-bit fingerprints:
+    # arrays, memoryviews or NumPy arrays
+    if not len(a) or not len(b):
+        return 0
+    if np is not None and isinstance(a, np.ndarray):
+        # Vectorized: position of each of a's values in b, then count the exact hits
+        i = np.searchsorted(b, a)
+        i[i == len(b)] = 0
+        return int(np.count_nonzero(b[i] == a))
+    # Sorting two sorted runs is a single merge; shared values end up adjacent
+    merged = sorted(chain(a, b))
+    return sum(map(eq, merged, islice(merged, 1, None)))
+
+class FingerprintArray:
+    # Frozen, read-only set of fingerprints as one sorted array of 8-byte values: a NumPy
+    # uint64 array when NumPy is installed, otherwise array('Q'). Membership is a binary
+    # search, and the intersection of two frozen sets is a merge of the sorted values
+    def __init__(self, fingerprints):
+        values = array("Q", sorted(fingerprints))
+        self.count = len(values)
+        self.values = values if np is None else np.frombuffer(values, dtype=np.uint64)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.values if np is None else self.values.tolist())
+
+    def find(self, fp):
+        values = self.values
+        if np is not None:
+            i = int(np.searchsorted(values, fp))
+        else:
+            i = bisect_left(values, fp)
+        return i < self.count and values[i] == fp
+
+    def intersection_size(self, other):
+        # Number of fingerprints in both sets
+        return intersection_size(self.values, other.values)
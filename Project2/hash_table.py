@@ -1,3 +1,7 @@
+from array import array
+from hashlib import blake2b
+from operator import mul
+
 def is_prime(n):
     if n < 2:
         return False
@@ -16,35 +20,344 @@ def next_prime(n):
             return candidate
         candidate += 1
 
-class HashSet:
-    def __init__(self, collision_type, params):
-        if collision_type != "Chain":
-            raise NotImplementedError("Only chaining is implemented")
-        z, table_size = params
+# The size a table grows to from each size it has had: the smallest prime above twice
+# it. Each one is found by trial division once per process, and a table's sizes chain
+# from its own first size, so growth stays about 2x wherever it starts. Seeded with
+# the chain from 3
+PRIME_LADDER = (
+    3, 7, 17, 37, 79, 163, 331, 673, 1361, 2729, 5471, 10949, 21911, 43853, 87719,
+    175447, 350899, 701819, 1403641, 2807303, 5614657, 11229331, 22458671, 44917381,
+    89834777, 179669557, 359339171, 718678369, 1437356741, 2874713497, 5749427029,
+    11498854069, 22997708177, 45995416409, 91990832831, 183981665689, 367963331389,
+    735926662813, 1471853325643,
+)
+_NEXT_SIZE = dict(zip(PRIME_LADDER, PRIME_LADDER[1:]))
+
+def grow_size(size, above=0):
+    # First size after size on its chain that is above `above`
+    while True:
+        nxt = _NEXT_SIZE.get(size)
+        if nxt is None:
+            nxt = _NEXT_SIZE[size] = next_prime(2 * size)
+        size = nxt
+        if size > above:
+            return size
+
+# Full-width hashes live modulo this Mersenne prime; a table slot is hash % size
+HASH_MOD = (1 << 61) - 1
+# A large base fixed once at random: two different word sequences of length n share a
+# rolling hash only if it is a root of their difference polynomial, about n / 2^61
+TOKEN_BASE = 2055722633178482350
+
+def token_hash(word):
+    # Well-mixed 64-bit digest of the word, so tokens look random to the rolling hash
+    # and to the low-bit binning of MinHash
+    return int.from_bytes(blake2b(word.encode("utf-8"), digest_size=8).digest(), "big") % HASH_MOD
+
+class RollingHash:
+    # The hash of words w_1..w_k is sum(token_hash(w_i) * TOKEN_BASE^(k-i)) mod HASH_MOD,
+    # so sliding an n-word window along by one word costs O(1)
+    def __init__(self, n):
+        self.n = n
+        self.top = pow(TOKEN_BASE, n - 1, HASH_MOD)
+
+    def hash(self, words):
+        return self.combine([token_hash(word) for word in words])
+
+    def combine(self, tokens):
+        # Hash of a word sequence given the token_hash of each word
+        h = 0
+        for t in tokens:
+            h = (h * TOKEN_BASE + t) % HASH_MOD
+        return h
+
+    def roll(self, tokens):
+        # Yield (i, hash of words[i:i+n]) for every full window, given the token_hash of each word
+        n = self.n
+        if len(tokens) < n:
+            return
+        h = self.combine(tokens[:n])
+        yield 0, h
+        for i in range(1, len(tokens) - n + 1):
+            h = ((h - tokens[i - 1] * self.top) * TOKEN_BASE + tokens[i + n - 1]) % HASH_MOD
+            yield i, h
+
+    def key_hash(self, key):
+        # Hash of a space-joined n-gram, for lookups by the string alone
+        return self.hash(key.split(" "))
+
+class FingerprintSet:
+    # Set of full-width integer hashes (fingerprints) kept in one array('Q') of 8-byte
+    # slots with linear probing. A fingerprint is its own hash and is stored plus one,
+    # so a zero slot is empty; at the default load that is 16 bytes per fingerprint
+    def __init__(self, size=3, max_load=0.5):
+        self.max_load = max_load
+        self.count = 0
+        self._allocate(grow_size(1, size))  # the chain from 3
+
+    def _allocate(self, size):
+        self.size = size
+        self.table = array("Q", bytes(8 * size))
+
+    def insert(self, fp):
+        # Returns whether fp was new
+        table, size = self.table, self.size
+        v = fp + 1
+        slot = fp % size
+        while True:
+            k = table[slot]
+            if k == 0:
+                break
+            if k == v:
+                return False
+            slot += 1
+            if slot == size:
+                slot = 0
+        table[slot] = v
+        self.count += 1
+        if self.count / size >= self.max_load:
+            self._resize(grow_size(size))
+        return True
+
+    def find(self, fp):
+        table, size = self.table, self.size
+        v = fp + 1
+        slot = fp % size
+        while True:
+            k = table[slot]
+            if k == v:
+                return True
+            if k == 0:
+                return False
+            slot += 1
+            if slot == size:
+                slot = 0
+
+    def __iter__(self):
+        for v in self.table:
+            if v:
+                yield v - 1
+
+    def __len__(self):
+        return self.count
+
+    def get_load(self):
+        return self.count / self.size
+
+    def reserve(self, n):
+        # Make room for n fingerprints in total, so inserting up to n never resizes
+        if n / self.size >= self.max_load:
+            self._resize(grow_size(self.size, int(n / self.max_load)))
+
+    def _resize(self, new_size):
+        old = self.table
+        self._allocate(new_size)
+        table = self.table
+        for v in old:
+            if v:
+                slot = (v - 1) % new_size
+                while table[slot]:
+                    slot += 1
+                    if slot == new_size:
+                        slot = 0
+                table[slot] = v
+
+def _poly(key, pows, z, mod):
+    # The character hash (h * z + ord(c)) % mod over key, as sum(ord(c) * z^k) with the
+    # powers z^k % mod cached in pows (extended as needed), so the loop runs in C. The
+    # key is walked backwards in place; an ASCII key is read as bytes, skipping ord
+    while len(pows) < len(key):
+        pows.append(pows[-1] * z % mod)
+    if key.isascii():
+        return sum(map(mul, reversed(key.encode()), pows)) % mod
+    return sum(map(mul, map(ord, reversed(key)), pows)) % mod
+
+COLLISION_TYPES = ("Chain", "Linear", "Double", "RobinHood")
+
+class _Deleted:
+    # Tombstone left in an open-addressing slot by a removal, so later probes walk past it
+    def __repr__(self):
+        return "TOMBSTONE"
+
+    def __reduce__(self):
+        return "TOMBSTONE"
+
+TOMBSTONE = _Deleted()
+
+class _HashTable:
+    # Shared machinery for HashSet and HashMap.
+    #   "Chain"     - list buckets; params (z, table_size)
+    #   "Linear"    - open addressing, step 1; params (z, table_size)
+    #   "Double"    - open addressing, step c2 - (key hash with z2 mod c2); params (z1, z2, c2, table_size)
+    #   "RobinHood" - linear probing that keeps entries ordered by probe distance; params (z, table_size)
+    # Every entry keeps the full-width hash of its key (key_hash, or the character hash with
+    # base z mod HASH_MOD) and sits at hash % size. Lookups compare stored hashes before
+    # keys, and resizing never hashes a key again. Open addressing uses flat preallocated
+    # slot lists: keys (None = empty), hashes, Double hashing steps, Robin Hood probe
+    # distances and map values
+    def __init__(self, collision_type, params, key_hash=None, max_load=0.5):
+        if collision_type not in COLLISION_TYPES:
+            raise NotImplementedError(f"Unknown collision type '{collision_type}'")
+        if collision_type == "Double":
+            z, z2, c2, table_size = params
+            self.z2 = z2
+            self.c2 = c2
+            self._pows2 = [1]
+        else:
+            z, table_size = params
+        self.collision_type = collision_type
+        self.chained = collision_type == "Chain"
         self.z = z
+        self._pows = [1]
+        self.key_hash = key_hash
+        self.max_load = max_load
         self.size = next_prime(table_size)
         self.count = 0
-        self.table = [[] for _ in range(self.size)]
+        self.tombstones = 0
+        self._allocate()
+
+    def _allocate(self):
+        # Chained buckets are created on first use, so empty ones cost one slot
+        self.table = [None] * self.size
+        if self.chained:
+            return
+        self.hashes = [0] * self.size
+        self.dist = [-1] * self.size if self.collision_type == "RobinHood" else None
+        # Second hash of each Double entry, kept so resizing never walks a key
+        self.steps = [0] * self.size if self.collision_type == "Double" else None
+        self.values = None
+
+    def _full_hash(self, key):
+        if self.key_hash is not None:
+            return self.key_hash(key)
+        return _poly(key, self._pows, self.z, HASH_MOD)
 
     def _hash(self, key):
-        h = 0
-        for c in key:
-            h = (h * self.z + ord(c)) % self.size
-        return h
+        return self._full_hash(key) % self.size
 
-    def insert(self, key):
-        idx = self._hash(key)
-        bucket = self.table[idx]
-        if key in bucket:
+    def _step_hash(self, key, h):
+        # Double hashing's second hash of key (full hash h), or None for the other types
+        if self.steps is None:
+            return None
+        if self.key_hash is not None:
+            return (h >> 32) % self.c2
+        return _poly(key, self._pows2, self.z2, self.c2)
+
+    def _start(self, h, g):
+        # First slot and step of the probe sequence for full hash h and second hash g
+        slot = h % self.size
+        if g is None:
+            return slot, 1
+        return slot, (self.c2 - g) % self.size or 1
+
+    def _locate(self, key, h):
+        # Slot holding key, or -1
+        slot, step = self._start(h, self._step_hash(key, h))
+        table, hashes, dist = self.table, self.hashes, self.dist
+        for d in range(self.size):
+            k = table[slot]
+            if k is None:
+                return -1
+            if dist is not None and dist[slot] < d:
+                return -1  # Robin Hood: key would have displaced this entry
+            if hashes[slot] == h and k == key:
+                return slot
+            slot = (slot + step) % self.size
+        return -1
+
+    def _claim(self, key, h, g):
+        # Return (slot, True) if key is present, else (slot to store it in, False).
+        # The first tombstone on the probe path is reused
+        slot, step = self._start(h, g)
+        table, hashes = self.table, self.hashes
+        free = -1
+        for _ in range(self.size):
+            k = table[slot]
+            if k is None:
+                return (slot if free == -1 else free), False
+            if k is TOMBSTONE:
+                if free == -1:
+                    free = slot
+            elif hashes[slot] == h and k == key:
+                return slot, True
+            slot = (slot + step) % self.size
+        if free == -1:
+            raise RuntimeError("Hash table is full")
+        return free, False
+
+    def _put(self, key, h, value):
+        # Open addressing insert; returns False if key was already present (its value is replaced)
+        if self.dist is not None:
+            slot = self._locate(key, h)
+            if slot != -1:
+                self._set_value(slot, value)
+                return False
+            self._robin_hood(key, h, value)
+            return True
+
+        g = self._step_hash(key, h)
+        slot, found = self._claim(key, h, g)
+        if not found:
+            if self.table[slot] is TOMBSTONE:
+                self.tombstones -= 1
+            self.table[slot] = key
+            self.hashes[slot] = h
+            if g is not None:
+                self.steps[slot] = g
+        self._set_value(slot, value)
+        return not found
+
+    def _robin_hood(self, key, h, value):
+        # Walk the probe sequence and take the slot of the first entry closer to home
+        slot, _ = self._start(h, None)
+        table, hashes, dist = self.table, self.hashes, self.dist
+        d = 0
+        while True:
+            if table[slot] is None:
+                table[slot] = key
+                hashes[slot] = h
+                dist[slot] = d
+                self._set_value(slot, value)
+                return
+            if dist[slot] < d:
+                key, table[slot] = table[slot], key
+                h, hashes[slot] = hashes[slot], h
+                d, dist[slot] = dist[slot], d
+                value = self._swap_value(slot, value)
+            slot = (slot + 1) % self.size
+            d += 1
+
+    def _remove_at(self, slot):
+        self.count -= 1
+        table, hashes, dist = self.table, self.hashes, self.dist
+        if dist is None:
+            table[slot] = TOMBSTONE
+            self._set_value(slot, None)
+            self.tombstones += 1
             return
-        bucket.append(key)
-        self.count += 1
-        if self.count / self.size >= 0.5:
-            self._rehash()
 
-    def find(self, key):
-        idx = self._hash(key)
-        return key in self.table[idx]
+        # Robin Hood: shift the following displaced entries back by one instead of leaving a tombstone
+        nxt = (slot + 1) % self.size
+        while table[nxt] is not None and dist[nxt] > 0:
+            table[slot] = table[nxt]
+            hashes[slot] = hashes[nxt]
+            dist[slot] = dist[nxt] - 1
+            self._set_value(slot, self._swap_value(nxt, None))
+            slot = nxt
+            nxt = (nxt + 1) % self.size
+        table[slot] = None
+        dist[slot] = -1
+        self._set_value(slot, None)
+
+    def _set_value(self, slot, value):
+        pass
+
+    def _swap_value(self, slot, value):
+        return None
+
+    def _check_load(self):
+        if (self.count + self.tombstones) / self.size >= self.max_load:
+            self._rehash()
 
     def get_slot(self, key):
         return self._hash(key)
@@ -52,87 +365,207 @@ class HashSet:
     def get_load(self):
         return self.count / self.size
 
+    def reserve(self, n):
+        # Make room for n keys in total, so inserting up to n never rehashes
+        if (n + self.tombstones) / self.size >= self.max_load:
+            self._resize(grow_size(self.size, int(n / self.max_load)))
+
+    def _rehash(self):
+        # Mostly tombstones: rebuild at the same size to clear them
+        if self.chained or self.count / self.size >= self.max_load / 2:
+            self._resize(grow_size(self.size))
+        else:
+            self._resize(self.size)
+
+    def _resize(self, new_size):
+        # Move every entry into a table of new_size. Entries keep their stored hashes
+        # and are placed directly: no membership or load checks, and no new bucket
+        # lists beyond the occupied ones
+        old_count = self.count
+        if self.chained:
+            old = self.table
+            self.size = new_size
+            self._allocate()
+            table = self.table
+            for bucket in old:
+                if bucket:
+                    for entry in bucket:
+                        idx = entry[0] % new_size
+                        if table[idx] is None:
+                            table[idx] = [entry]
+                        else:
+                            table[idx].append(entry)
+        else:
+            old_table, old_hashes, old_steps, old_values = self.table, self.hashes, self.steps, self.values
+            self.size = new_size
+            self.tombstones = 0
+            self._allocate()
+            for slot, key in enumerate(old_table):
+                if key is not None and key is not TOMBSTONE:
+                    self._place(key, old_hashes[slot], None if old_steps is None else old_steps[slot],
+                                None if old_values is None else old_values[slot])
+        # Verify count is preserved
+        assert self.count == old_count
+
+    def _place(self, key, h, g, value):
+        # Store a key known to be absent in a table without tombstones
+        if self.dist is not None:
+            self._robin_hood(key, h, value)
+            return
+        slot, step = self._start(h, g)
+        table = self.table
+        while table[slot] is not None:
+            slot = (slot + step) % self.size
+        table[slot] = key
+        self.hashes[slot] = h
+        if g is not None:
+            self.steps[slot] = g
+        self._set_value(slot, value)
+
+class HashSet(_HashTable):
+    # Callers that already know the full hash of a key (e.g. a RollingHash built as this
+    # set's key_hash) can use insert_hashed / find_hashed and skip hashing altogether.
+    # Chained entries are (hash, key) pairs
+    def insert(self, key):
+        self.insert_hashed(key, self._full_hash(key))
+
+    def insert_hashed(self, key, h):
+        # h is the full hash of key, as _full_hash would compute it
+        if self.chained:
+            idx = h % self.size
+            bucket = self.table[idx]
+            entry = (h, key)
+            if bucket is None:
+                self.table[idx] = [entry]
+            elif entry in bucket:
+                return
+            else:
+                bucket.append(entry)
+        elif not self._put(key, h, None):
+            return
+        self.count += 1
+        self._check_load()
+
+    def find(self, key):
+        return self.find_hashed(key, self._full_hash(key))
+
+    def find_hashed(self, key, h):
+        if self.chained:
+            bucket = self.table[h % self.size]
+            return bucket is not None and (h, key) in bucket
+        return self._locate(key, h) != -1
+
+    def remove(self, key):
+        # Remove key if present; returns whether it was
+        h = self._full_hash(key)
+        if self.chained:
+            bucket = self.table[h % self.size]
+            if bucket is None or (h, key) not in bucket:
+                return False
+            bucket.remove((h, key))
+            self.count -= 1
+            return True
+        slot = self._locate(key, h)
+        if slot == -1:
+            return False
+        self._remove_at(slot)
+        return True
+
     def __str__(self):
         parts = []
+        if not self.chained:
+            for k in self.table:
+                if k is None:
+                    parts.append("⟨EMPTY⟩")
+                elif k is TOMBSTONE:
+                    parts.append("⟨DELETED⟩")
+                else:
+                    parts.append(k)
+            return " | ".join(parts)
         for bucket in self.table:
             if bucket:
-                parts.append(" ; ".join(bucket))
+                parts.append(" ; ".join(key for _, key in bucket))
             else:
                 parts.append("⟨EMPTY⟩")
         return " | ".join(parts)
 
-    def _rehash(self):
-        old = self.table
-        new_size = next_prime(self.size * 2)
-        self.size = new_size
-        self.table = [[] for _ in range(self.size)]
-        old_count = self.count
-        self.count = 0
-        for bucket in old:
-            for key in bucket:
-                self.insert(key)
-        # Verify count is preserved
-        assert self.count == old_count
+class HashMap(_HashTable):
+    # Chained entries are (hash, key, value) triples
+    def _allocate(self):
+        super()._allocate()
+        if not self.chained:
+            self.values = [None] * self.size
 
-class HashMap:
-    def __init__(self, collision_type, params):
-        if collision_type != "Chain":
-            raise NotImplementedError("Only chaining is implemented")
-        z, table_size = params
-        self.z = z
-        self.size = next_prime(table_size)
-        self.count = 0
-        self.table = [[] for _ in range(self.size)]
+    def _set_value(self, slot, value):
+        self.values[slot] = value
 
-    def _hash(self, key):
-        h = 0
-        for c in key:
-            h = (h * self.z + ord(c)) % self.size
-        return h
+    def _swap_value(self, slot, value):
+        old, self.values[slot] = self.values[slot], value
+        return old
 
     def insert(self, key, value):
-        idx = self._hash(key)
-        bucket = self.table[idx]
-        for i, (k, v) in enumerate(bucket):
-            if k == key:
-                bucket[i] = (key, value)
-                return
-        bucket.append((key, value))
+        self.insert_hashed(key, value, self._full_hash(key))
+
+    def insert_hashed(self, key, value, h):
+        # h is the full hash of key, as _full_hash would compute it
+        if self.chained:
+            idx = h % self.size
+            bucket = self.table[idx]
+            if bucket is None:
+                bucket = self.table[idx] = []
+            for i, (eh, k, v) in enumerate(bucket):
+                if eh == h and k == key:
+                    bucket[i] = (h, key, value)
+                    return
+            bucket.append((h, key, value))
+        elif not self._put(key, h, value):
+            return
         self.count += 1
-        if self.count / self.size >= 0.5:
-            self._rehash()
+        self._check_load()
 
     def find(self, key):
-        idx = self._hash(key)
-        for k, v in self.table[idx]:
-            if k == key:
-                return v
-        return None
+        return self.find_hashed(key, self._full_hash(key))
 
-    def get_slot(self, key):
-        return self._hash(key)
+    def find_hashed(self, key, h):
+        if self.chained:
+            for eh, k, v in self.table[h % self.size] or ():
+                if eh == h and k == key:
+                    return v
+            return None
+        slot = self._locate(key, h)
+        return None if slot == -1 else self.values[slot]
 
-    def get_load(self):
-        return self.count / self.size
+    def remove(self, key):
+        # Remove key if present; returns whether it was
+        h = self._full_hash(key)
+        if self.chained:
+            bucket = self.table[h % self.size] or []
+            for i, (eh, k, v) in enumerate(bucket):
+                if eh == h and k == key:
+                    del bucket[i]
+                    self.count -= 1
+                    return True
+            return False
+        slot = self._locate(key, h)
+        if slot == -1:
+            return False
+        self._remove_at(slot)
+        return True
 
     def __str__(self):
         parts = []
+        if not self.chained:
+            for k, v in zip(self.table, self.values):
+                if k is None:
+                    parts.append("⟨EMPTY⟩")
+                elif k is TOMBSTONE:
+                    parts.append("⟨DELETED⟩")
+                else:
+                    parts.append(f"({k}, {v})")
+            return " | ".join(parts)
         for bucket in self.table:
             if bucket:
-                parts.append(" ; ".join(f"({k}, {v})" for k, v in bucket))
+                parts.append(" ; ".join(f"({k}, {v})" for _, k, v in bucket))
             else:
                 parts.append("⟨EMPTY⟩")
         return " | ".join(parts)
-
-    def _rehash(self):
-        old = self.table
-        new_size = next_prime(self.size * 2)
-        self.size = new_size
-        self.table = [[] for _ in range(self.size)]
-        old_count = self.count
-        self.count = 0
-        for bucket in old:
-            for k, v in bucket:
-                self.insert(k, v)
-        # Verify count is preserved
-        assert self.count == old_count
@@ -0,0 +1,77 @@
+from hash_table import HashMap, HASH_MOD
+
+def signature(hashes, num_perm):
+    # One-permutation MinHash: each full n-gram hash falls in bin h % num_perm and every
+    # bin keeps its smallest hash, so the whole signature costs one pass over the set.
+    # Two documents agree on a bin with probability close to their Jaccard similarity.
+    # Empty bins borrow the next non-empty bin to their right, offset by the distance,
+    # so short documents still get comparable values in every position
+    sig = [HASH_MOD] * num_perm
+    for h in hashes:
+        b = h % num_perm
+        if h < sig[b]:
+            sig[b] = h
+
+    last = -1
+    for b in range(2 * num_perm - 1, -1, -1):
+        b %= num_perm
+        if sig[b] < HASH_MOD:
+            last = b
+        elif last != -1:
+            sig[b] = sig[last] + (last - b) % num_perm * HASH_MOD
+    return sig
+
+def candidate_probability(similarity, num_perm, bands):
+    # Chance that two documents with this Jaccard similarity share at least one band
+    rows = num_perm // bands
+    return 1 - (1 - similarity ** rows) ** bands
+
+def choose_bands(num_perm, threshold, recall=0.95):
+    # Fewest bands (longest bands, fewest candidates) that still propose a pair at the
+    # threshold with the requested probability
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands == 0 and candidate_probability(threshold, num_perm, bands) >= recall:
+            return bands
+    return num_perm
+
+class LSHIndex:
+    # Splits each signature into bands of num_perm // bands rows and buckets documents by
+    # band. Documents sharing any bucket become a candidate pair. More bands find more
+    # of the similar pairs at the cost of more candidates to verify
+    def __init__(self, num_perm, bands):
+        if bands < 1 or num_perm % bands != 0:
+            raise ValueError("bands must divide num_perm")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # band key -> list of document ids, in insertion order
+        self.buckets = HashMap("Chain", (1, 1009), key_hash=int)
+        self.keys = []
+
+    def band_keys(self, sig):
+        r = self.rows
+        return [hash((b, *sig[b * r:(b + 1) * r])) % HASH_MOD for b in range(self.bands)]
+
+    def add(self, sig):
+        # Index the next document id; returns that id
+        doc = len(self.keys)
+        keys = self.band_keys(sig)
+        for key in keys:
+            bucket = self.buckets.find(key)
+            if bucket is None:
+                self.buckets.insert(key, [doc])
+            else:
+                bucket.append(doc)
+        self.keys.append(keys)
+        return doc
+
+    def candidate_pairs(self):
+        # Sorted (i, j) pairs with i < j that share at least one band
+        pairs = set()
+        for i, keys in enumerate(self.keys):
+            for key in keys:
+                for j in self.buckets.find(key):
+                    if j >= i:
+                        break
+                    pairs.add((j, i))
+        return sorted(pairs)
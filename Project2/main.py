@@ -1,5 +1,43 @@
+import random
+from hash_table import COLLISION_TYPES, HashMap, HashSet
 from plagiarism_engine import PlagiarismEngine
 
+def table_params(collision_type):
+    # Small starting tables, so the checks below grow, rehash and clear tombstones often
+    return (31, 37, 13, 7) if collision_type == "Double" else (257, 7)
+
+def check_collision_type(collision_type, n_steps=20000):
+    # HashSet and HashMap must agree with a Python set / dict over a seeded mix of
+    # insert, remove, find and reserve, including keys that are removed and re-inserted
+    rng = random.Random(COLLISION_TYPES.index(collision_type))
+    keys = ["".join(rng.choice("abcde") for _ in range(rng.randint(0, 4))) for _ in range(300)]
+    hs, expected_set = HashSet(collision_type, table_params(collision_type)), set()
+    hm, expected_map = HashMap(collision_type, table_params(collision_type)), {}
+    for step in range(n_steps):
+        key = rng.choice(keys)
+        op = rng.random()
+        if op < 0.4:
+            hs.insert(key)
+            expected_set.add(key)
+            hm.insert(key, step)
+            expected_map[key] = step
+        elif op < 0.7:
+            if hs.remove(key) != (key in expected_set) or hm.remove(key) != (key in expected_map):
+                return False
+            expected_set.discard(key)
+            expected_map.pop(key, None)
+        elif op < 0.999:
+            if hs.find(key) != (key in expected_set) or hm.find(key) != expected_map.get(key):
+                return False
+        else:
+            n = len(expected_set) + rng.randint(0, 200)
+            hs.reserve(n)
+            hm.reserve(n)
+        if hs.count != len(expected_set) or hm.count != len(expected_map):
+            return False
+    return (all(hs.find(key) == (key in expected_set) for key in keys) and
+            all(hm.find(key) == expected_map.get(key) for key in keys))
+
 def main():
     print("=== Plagiarism Detection Engine Test ===")
     
@@ -50,6 +88,13 @@ def main():
             print(f"{t1} -- {t2}: {score:.4f}")
     else:
         print("No pairs found above threshold 0.1")
+    
+    print("\n=== Hash Tables Against set / dict ===")
+    for collision_type in COLLISION_TYPES:
+        if check_collision_type(collision_type):
+            print(f"[{collision_type}] insert / remove / find / reserve PASSED")
+        else:
+            print(f"[{collision_type}] insert / remove / find / reserve FAILED")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
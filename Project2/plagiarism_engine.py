@@ -1,15 +1,54 @@
-from hash_table import HashSet, HashMap
+import multiprocessing
+from array import array
+from bisect import bisect_left
+from itertools import chain, compress, count, islice, repeat
+from operator import and_, lshift, ne, or_, rshift, sub
+from multiprocessing.shared_memory import SharedMemory
+from hash_table import FingerprintSet, HashMap, RollingHash, token_hash
+from fingerprint_array import FingerprintArray, intersection_size, np
+from lsh import LSHIndex, signature
+
+# Side of the square blocks of the pair space scored by one worker task
+PAIR_TILE = 256
+# find_most_similar folds the inverted index's delta into its arrays once the delta holds more
+# than this many postings, or more than a quarter of the ones already in the arrays
+POSTING_DELTA_MIN = 4096
 
 class PlagiarismEngine:
-    def __init__(self, collision_type, params, n):
+    def __init__(self, collision_type, params, n, num_perm=128, bands=32):
         if n < 1:
             raise ValueError("n-gram size must be at least 1")
         self.n = n
+        # collision_type and params choose only the two HashMaps keyed by title below;
+        # the n-grams of every document go into a FingerprintSet whatever they are
         self.collision_type = collision_type
         self.params = params
-        # Map title -> HashSet of n-grams
-        self.docs = HashMap("Chain", params)
+        # Map title -> FingerprintSet of n-gram fingerprints (rolling hashes of the n words),
+        # or a sorted FingerprintArray once the document is frozen
+        self.docs = HashMap(collision_type, params)
         self.titles = []
+        # Map title -> document id (its position in titles)
+        self.ids = HashMap(collision_type, params)
+        # n-gram hashes roll over word hashes instead of hashing every joined n-gram
+        self.rolling = RollingHash(n)
+        # Interned vocabulary: word -> id, and id -> token_hash of the word
+        self.word_ids = {}
+        self.word_tokens = []
+        # MinHash signatures banded into an LSH index, for approximate report_similar_pairs
+        self.num_perm = num_perm
+        self.lsh = LSHIndex(num_perm, bands)
+        # Inverted index in three flat arrays: the sorted distinct n-gram fingerprints, and
+        # for the k-th one the ascending ids of the documents containing it in
+        # posting_ids[posting_offsets[k]:posting_offsets[k + 1]]. Documents added since the
+        # last find_most_similar wait in unindexed; that query moves their postings into
+        # posting_delta, a sorted list of fingerprint << 32 | id merged into the arrays once
+        # it is large
+        self.posting_keys = array("Q")
+        self.posting_offsets = array("Q", [0])
+        self.posting_ids = array("I")
+        self.posting_delta = []
+        self.unindexed = []
+        self.counts = []
 
     def add_document(self, title, word_list):
         # Check if title already exists
@@ -20,27 +59,89 @@ class PlagiarismEngine:
             raise ValueError("Document cannot be empty")
         
         W = len(word_list)
-        hset = HashSet(self.collision_type, self.params)
+        tokens = self.intern(word_list)
+        fps = FingerprintSet()
+        fps.reserve(max(W - self.n + 1, 1))
         
         if W >= self.n:
-            # Generate n-grams
-            for i in range(W - self.n + 1):
-                ngram = " ".join(word_list[i:i+self.n])
-                hset.insert(ngram)
+            # Generate n-gram fingerprints
+            for _, h in self.rolling.roll(tokens):
+                fps.insert(h)
         else:
             # If document is shorter than n, treat the whole document as one n-gram
-            ngram = " ".join(word_list)
-            hset.insert(ngram)
+            fps.insert(self.rolling.combine(tokens))
         
         # Store the document
-        self.docs.insert(title, hset)
+        doc = len(self.titles)
+        self.docs.insert(title, fps)
+        self.ids.insert(title, doc)
         self.titles.append(title)
+        self.counts.append(fps.count)
+        self.lsh.add(signature(fps, self.num_perm))
+        
+        self.unindexed.append(doc)
+
+    def _update_postings(self):
+        # Add the postings of the documents added since the last query to the delta and sort
+        # it (sort() takes its already sorted part as one run), or fold the delta into the
+        # flat arrays once it is large
+        if not self.unindexed:
+            return
+        delta = self.posting_delta
+        for doc in self.unindexed:
+            delta.extend(h << 32 | doc for h in self.docs.find(self.titles[doc]))
+        self.unindexed = []
+        if len(delta) > max(POSTING_DELTA_MIN, len(self.posting_ids) // 4):
+            self._merge_postings()
+        else:
+            delta.sort()
+
+    def _merge_postings(self):
+        # Fold posting_delta into the flat arrays: unpack them into packed entries, sort those
+        # together with the delta (the arrays are already one sorted run) and split the result
+        # back. Every step is a C-level iterator or array operation, so nothing loops in
+        # Python per posting
+        keys, offsets, ids = self.posting_keys, self.posting_offsets, self.posting_ids
+        lengths = map(sub, islice(offsets, 1, None), offsets)
+        hs = chain.from_iterable(map(repeat, keys, lengths))
+        entries = list(map(or_, map(lshift, hs, repeat(32)), ids))
+        entries.extend(self.posting_delta)
+        entries.sort()
+        hs = list(map(rshift, entries, repeat(32)))
+        starts = list(map(ne, hs, chain((-1,), hs)))
+        self.posting_keys = array("Q", compress(hs, starts))
+        self.posting_offsets = array("Q", compress(count(), starts))
+        self.posting_offsets.append(len(entries))
+        self.posting_ids = array("I", map(and_, entries, repeat(0xFFFFFFFF)))
+        self.posting_delta = []
+
+    def intern(self, word_list):
+        # Map words to vocabulary ids, adding new ones; returns the token hash of every word
+        ids, tokens = self.word_ids, self.word_tokens
+        out = []
+        for word in word_list:
+            i = ids.get(word)
+            if i is None:
+                i = ids[word] = len(tokens)
+                tokens.append(token_hash(word))
+            out.append(tokens[i])
+        return out
+
+    def freeze(self, title=None):
+        # Replace the FingerprintSet of title (or of every document) with a FingerprintArray:
+        # half the memory, and compare_pair between two frozen documents becomes a merge
+        for t in (self.titles if title is None else [title]):
+            fps = self.docs.find(t)
+            if fps is None:
+                raise ValueError(f"Document '{t}' not found")
+            if isinstance(fps, FingerprintSet):
+                self.docs.insert(t, FingerprintArray(fps))
 
     def get_distinct_count(self, title):
-        hset = self.docs.find(title)
-        if hset is None:
+        fps = self.docs.find(title)
+        if fps is None:
             return 0
-        return hset.count
+        return fps.count
 
     def compare_pair(self, title1, title2):
         set1 = self.docs.find(title1)
@@ -60,47 +161,82 @@ class PlagiarismEngine:
         else:
             small, large = set2, set1
 
-        inter = 0
-        # Count intersection by iterating through smaller set
-        for bucket in small.table:
-            for key in bucket:
-                if large.find(key):
+        if isinstance(small, FingerprintArray) and isinstance(large, FingerprintArray):
+            inter = small.intersection_size(large)
+        else:
+            inter = 0
+            # Count intersection by iterating through smaller set
+            for h in small:
+                if large.find(h):
                     inter += 1
 
         union = set1.count + set2.count - inter
         return inter / union if union > 0 else 0.0
 
     def find_most_similar(self, title):
-        if title not in self.titles:
+        doc = self.ids.find(title)
+        if doc is None:
             raise ValueError(f"Document '{title}' not found")
         
         if len(self.titles) <= 1:
             return [], 0.0  # No other documents to compare
         
+        # One pass over the query's n-grams counts the intersection with every document
+        # sharing at least one of them; all other documents score 0
+        self._update_postings()
+        keys, offsets, ids = self.posting_keys, self.posting_offsets, self.posting_ids
+        delta = self.posting_delta
+        shared = {}
+        for h in self.docs.find(title):
+            k = bisect_left(keys, h)
+            if k < len(keys) and keys[k] == h:
+                for other in ids[offsets[k]:offsets[k + 1]]:
+                    shared[other] = shared.get(other, 0) + 1
+            k = bisect_left(delta, h << 32)
+            while k < len(delta) and delta[k] >> 32 == h:
+                other = delta[k] & 0xFFFFFFFF
+                shared[other] = shared.get(other, 0) + 1
+                k += 1
+        del shared[doc]
+        
+        if not shared:
+            return [t for t in self.titles if t != title], 0.0
+        
         best = []
         best_score = -1.0
+        count = self.counts[doc]
         
-        for other in self.titles:
-            if other == title:
-                continue
-            score = self.compare_pair(title, other)
+        for other in sorted(shared):
+            inter = shared[other]
+            score = inter / (count + self.counts[other] - inter)
             if score > best_score:
                 best_score = score
-                best = [other]
+                best = [self.titles[other]]
             elif score == best_score:
-                best.append(other)
+                best.append(self.titles[other])
         
         return best, best_score
 
-    def report_similar_pairs(self, threshold):
+    def report_similar_pairs(self, threshold, approximate=False, workers=1):
         if not (0 <= threshold <= 1):
             raise ValueError("Threshold must be between 0 and 1")
         
         results = []
         K = len(self.titles)
         
-        for i in range(K):
-            for j in range(i+1, K):
+        if approximate:
+            # Verify only the pairs the LSH index proposes; pairs sharing no band are missed
+            pairs = self.lsh.candidate_pairs()
+        else:
+            pairs = None
+        
+        if workers > 1 and K > 1:
+            for i, j, score in self._parallel_pairs(threshold, pairs, workers):
+                results.append((self.titles[i], self.titles[j], score))
+        else:
+            if pairs is None:
+                pairs = ((i, j) for i in range(K) for j in range(i+1, K))
+            for i, j in pairs:
                 t1 = self.titles[i]
                 t2 = self.titles[j]
                 score = self.compare_pair(t1, t2)
@@ -109,3 +245,86 @@ class PlagiarismEngine:
         
         return sorted(results, key=lambda x: x[2], reverse=True)  # Sort by score descending
 
+    def _parallel_pairs(self, threshold, pairs, workers):
+        # Score pairs on a process pool; returns (i, j, score) at or above threshold in (i, j) order.
+        # Every document's sorted fingerprints are packed into one shared memory block that the
+        # workers map instead of receiving copies. Without a candidate list the pair space is
+        # cut into PAIR_TILE x PAIR_TILE tiles on or above the diagonal
+        K = len(self.titles)
+        # Layout: K + 1 offsets, then every document's values back to back
+        offsets = array("Q", [0])
+        values = array("Q")
+        for title in self.titles:
+            fps = self.docs.find(title)
+            values.extend(fps if isinstance(fps, FingerprintArray) else sorted(fps))
+            offsets.append(len(values))
+
+        if pairs is None:
+            tasks = [(_score_tile, (i0, min(i0 + PAIR_TILE, K), j0, min(j0 + PAIR_TILE, K)))
+                     for i0 in range(0, K, PAIR_TILE) for j0 in range(i0, K, PAIR_TILE)]
+        else:
+            chunk = PAIR_TILE * PAIR_TILE // 16
+            tasks = [(_score_pairs, pairs[k:k + chunk]) for k in range(0, len(pairs), chunk)]
+
+        shm = SharedMemory(create=True, size=8 * (len(offsets) + len(values)))
+        try:
+            view = shm.buf.cast("Q")
+            view[:len(offsets)] = offsets
+            view[len(offsets):len(offsets) + len(values)] = values
+            view.release()
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            scored = []
+            with context.Pool(workers, initializer=_init_pair_worker, initargs=(shm.name, K, threshold)) as pool:
+                for found in pool.imap_unordered(_run_pair_task, tasks):
+                    scored.extend(found)
+        finally:
+            shm.close()
+            shm.unlink()
+        return sorted(scored)
+
+
+# Per-process state for PlagiarismEngine.report_similar_pairs workers
+_pair_shm = None
+_pair_docs = None
+_pair_threshold = None
+
+def _init_pair_worker(name, n_docs, threshold):
+    global _pair_shm, _pair_docs, _pair_threshold
+    _pair_shm = SharedMemory(name)
+    if np is not None:
+        view = np.frombuffer(_pair_shm.buf, dtype=np.uint64)
+    else:
+        view = _pair_shm.buf.cast("Q")
+    offsets = view[:n_docs + 1].tolist()
+    values = view[n_docs + 1:]
+    # One zero-copy slice of the shared values per document
+    _pair_docs = [values[offsets[d]:offsets[d + 1]] for d in range(n_docs)]
+    _pair_threshold = threshold
+
+def _run_pair_task(task):
+    score, arg = task
+    return score(arg)
+
+def _score(i, j):
+    a, b = _pair_docs[i], _pair_docs[j]
+    inter = intersection_size(a, b)
+    return inter / (len(a) + len(b) - inter)
+
+def _score_tile(tile):
+    i0, i1, j0, j1 = tile
+    found = []
+    for i in range(i0, i1):
+        for j in range(max(j0, i + 1), j1):
+            score = _score(i, j)
+            if score >= _pair_threshold:
+                found.append((i, j, score))
+    return found
+
+def _score_pairs(pairs):
+    found = []
+    for i, j in pairs:
+        score = _score(i, j)
+        if score >= _pair_threshold:
+            found.append((i, j, score))
+    return found